@@ -0,0 +1,107 @@
+import asyncio
+from collections import deque
+
+
+class Overloaded(Exception):
+    def __init__(self, name, reason, retry_after):
+        super().__init__(f"{name}: {reason}")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Slot:
+    __slots__ = ("_limiter", "_released")
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+        self._released = False
+
+    def release(self):
+        # idempotent, so a done callback and a finally can both call it
+        if not self._released:
+            self._released = True
+            self._limiter._release()
+
+
+class Limiter:
+    # Concurrency limit with a short FIFO wait queue, event-loop only like
+    # cache.ResponseCache. Up to `limit` holders run at once, up to
+    # `queue_size` more wait at most `max_wait` seconds for a free slot;
+    # everyone else gets Overloaded straight away, which the caller turns
+    # into a 503 instead of piling more work onto a saturated database.
+    def __init__(self, name, limit, queue_size, max_wait, retry_after=1):
+        if limit < 1 or queue_size < 0:
+            raise ValueError("invalid limiter %s: limit=%s queue=%s" % (name, limit, queue_size))
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+
+        self._active = 0
+        self._waiters = deque()
+
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.queue_max = 0
+
+    async def acquire(self):
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return Slot(self)
+
+        if len(self._waiters) >= self.queue_size:
+            self.shed_queue_full += 1
+            raise Overloaded(self.name, "queue full", self.retry_after)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        self.queue_max = max(self.queue_max, len(self._waiters))
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            self._forget(future)
+            self.shed_timeout += 1
+            raise Overloaded(self.name, "queue timeout", self.retry_after)
+        except asyncio.CancelledError:
+            self._forget(future)
+            if future.done() and not future.cancelled():
+                # the slot was handed over just as the caller went away
+                self._release()
+            raise
+        self.admitted += 1
+        return Slot(self)
+
+    def _forget(self, future):
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    def _release(self):
+        # hand the slot straight to the oldest waiter, _active stays the same
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "max_wait_seconds": self.max_wait,
+            "in_flight": self._active,
+            "queue_depth": len(self._waiters),
+            "queue_max": self.queue_max,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+        }
@@ -0,0 +1,87 @@
+PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Satu query per permintaan, seluruh agregasi di Postgres: statistik IPS dari
+# ips_summary (satu baris per mahasiswa per semester) dan histogram nilai dari
+# krs, keduanya per (jurusan, angkatan, semester), lalu digabung
+COHORT_QUERY = """
+    WITH ips AS (
+        SELECT m.jurusan, m.angkatan, s.semester,
+               COUNT(*) AS mahasiswa,
+               AVG(s.ips) AS ips_mean,
+               percentile_cont(%(percentiles)s::float8[]) WITHIN GROUP (ORDER BY s.ips) AS ips_percentiles,
+               MIN(s.ips) AS ips_min,
+               MAX(s.ips) AS ips_max,
+               SUM(s.total_sks) AS sks_total
+        FROM ips_summary s
+        JOIN mahasiswa m ON m.nim = s.nim
+        {ips_where}
+        GROUP BY m.jurusan, m.angkatan, s.semester
+    ),
+    grades AS (
+        SELECT jurusan, angkatan, semester, jsonb_object_agg(nilai, jumlah) AS histogram
+        FROM (
+            SELECT m.jurusan, m.angkatan, krs.semester, krs.nilai::text AS nilai, COUNT(*) AS jumlah
+            FROM krs
+            JOIN mahasiswa m ON m.nim = krs.nim
+            {krs_where}
+            GROUP BY m.jurusan, m.angkatan, krs.semester, krs.nilai
+        ) g
+        WHERE nilai IS NOT NULL
+        GROUP BY jurusan, angkatan, semester
+    )
+    SELECT ips.jurusan, ips.angkatan, ips.semester, ips.mahasiswa,
+           ips.ips_mean, ips.ips_percentiles, ips.ips_min, ips.ips_max,
+           ips.sks_total, grades.histogram
+    FROM ips
+    LEFT JOIN grades
+      ON grades.jurusan = ips.jurusan
+     AND grades.angkatan = ips.angkatan
+     AND grades.semester = ips.semester
+    ORDER BY ips.jurusan, ips.angkatan, ips.semester
+"""
+
+
+def cohort_query(jurusan, angkatan, semester):
+    ips_clauses = []
+    krs_clauses = []
+    params = {"percentiles": list(PERCENTILES)}
+    if jurusan is not None:
+        ips_clauses.append("m.jurusan = %(jurusan)s")
+        krs_clauses.append("m.jurusan = %(jurusan)s")
+        params["jurusan"] = jurusan
+    if angkatan is not None:
+        ips_clauses.append("m.angkatan = %(angkatan)s")
+        krs_clauses.append("m.angkatan = %(angkatan)s")
+        params["angkatan"] = angkatan
+    if semester is not None:
+        ips_clauses.append("s.semester = %(semester)s")
+        krs_clauses.append("krs.semester = %(semester)s")
+        params["semester"] = semester
+    ips_where = "WHERE " + " AND ".join(ips_clauses) if ips_clauses else ""
+    krs_where = "WHERE " + " AND ".join(krs_clauses) if krs_clauses else ""
+    return COHORT_QUERY.format(ips_where=ips_where, krs_where=krs_where), params
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def cohort_from_row(row):
+    percentiles = row[5] or [None] * len(PERCENTILES)
+    return {
+        "jurusan": row[0],
+        "angkatan": row[1],
+        "semester": row[2],
+        "mahasiswa": row[3],
+        "ips": {
+            "mean": _round(row[4]),
+            "median": _round(percentiles[PERCENTILES.index(0.5)]),
+            "min": _round(row[6]),
+            "max": _round(row[7]),
+            "percentiles": {
+                f"p{round(pct * 100)}": _round(value) for pct, value in zip(PERCENTILES, percentiles)
+            },
+        },
+        "sks_total": int(row[8]),
+        "nilai": dict(sorted((row[9] or {}).items())),
+    }
@@ -0,0 +1,91 @@
+import http.client
+import json
+import os
+import socket
+import subprocess
+import time
+import urllib.parse
+
+
+class Client:
+    # One keep-alive connection per worker thread, like a browser or a
+    # gateway upstream would hold; reconnects after any transport error
+    def __init__(self, base_url, timeout=30.0):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.prefix = parsed.path.rstrip("/")
+        self.timeout = timeout
+        self._conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        started = time.perf_counter()
+        try:
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                self._conn.connect()
+                # without this, Nagle + delayed ACK adds ~40 ms to small requests
+                self._conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._conn.request(method, self.prefix + path, body=body, headers=headers or {})
+            response = self._conn.getresponse()
+            payload = response.read()
+            status = response.status
+        except Exception:
+            self.close()
+            status, payload = 0, b""
+        return status, payload, time.perf_counter() - started
+
+    def get(self, path, headers=None):
+        return self.request("GET", path, headers=headers)
+
+    def post_json(self, path, data):
+        body = json.dumps(data)
+        return self.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(latencies, errors, wall):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def db_config_from_env():
+    # same variables as main.DB_CONFIG, but defaulting to a local database
+    return {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "port": os.getenv("DB_PORT", "5432"),
+        "database": os.getenv("DB_NAME", "products"),
+        "user": os.getenv("DB_USER", "productuser"),
+        "password": os.getenv("DB_PASSWORD", "productpass"),
+    }
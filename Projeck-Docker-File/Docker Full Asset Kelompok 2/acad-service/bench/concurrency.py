@@ -0,0 +1,103 @@
+"""Concurrent-request throughput benchmark for acad-service.
+
+Drives one endpoint at increasing concurrency levels and, in parallel,
+probes /health once every 50 ms. If DB calls block the event loop, /health
+latency climbs with concurrency even though it never touches Postgres.
+
+Run it against a build from before and after a change and compare:
+
+    python bench/concurrency.py --base-url http://localhost:3002 \
+        --path "/api/acad/ips?nim=22001" --levels 1,4,16,64 --duration 10
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import Client, percentile
+
+
+def run_level(base_url, path, concurrency, duration, timeout):
+    stop_at = time.perf_counter() + duration
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal errors
+        client = Client(base_url, timeout)
+        while time.perf_counter() < stop_at:
+            status, _, elapsed = client.get(path)
+            with lock:
+                latencies.append(elapsed)
+                if status == 0 or status >= 500:
+                    errors += 1
+        client.close()
+
+    health = []
+
+    def prober():
+        client = Client(base_url, timeout)
+        while time.perf_counter() < stop_at:
+            _, _, elapsed = client.get("/health")
+            health.append(elapsed)
+            time.sleep(0.05)
+        client.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency + 1) as executor:
+        executor.submit(prober)
+        for _ in range(concurrency):
+            executor.submit(worker)
+    wall = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "health_p50_ms": percentile(health, 50) * 1000,
+        "health_max_ms": max(health, default=0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:3002")
+    parser.add_argument("--path", default="/api/acad/ips?nim=22001")
+    parser.add_argument("--levels", default="1,4,16,64")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(",")]
+
+    print(f"{args.base_url}{args.path}, {args.duration:.0f}s per level")
+    print(
+        f"{'conc':>5} {'req':>8} {'err':>6} {'rps':>9} {'p50 ms':>9} "
+        f"{'p99 ms':>9} {'health p50':>11} {'health max':>11}"
+    )
+    results = []
+    for level in levels:
+        result = run_level(args.base_url, args.path, level, args.duration, args.timeout)
+        results.append(result)
+        print(
+            f"{result['concurrency']:>5} {result['requests']:>8} {result['errors']:>6} "
+            f"{result['rps']:>9.1f} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+            f"{result['health_p50_ms']:>11.1f} {result['health_max_ms']:>11.1f}"
+        )
+
+    if len(results) > 1 and results[0]["rps"]:
+        scaling = results[-1]["rps"] / results[0]["rps"]
+        print(
+            f"throughput x{scaling:.2f} from concurrency {levels[0]} to {levels[-1]}; "
+            f"median /health latency {statistics.median(r['health_p50_ms'] for r in results):.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
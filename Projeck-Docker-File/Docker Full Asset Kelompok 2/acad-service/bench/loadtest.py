@@ -0,0 +1,211 @@
+"""Load test for acad-service: throughput and latency percentiles per scenario.
+
+Each scenario runs at every concurrency level for --duration seconds after
+a short warmup. Workers pick random NIMs from a sample read through
+/api/acad/mahasiswa, so the response cache sees a realistic spread of keys.
+Results are printed and saved as JSON; pass an earlier file to --compare
+to see the change between commits:
+
+    python bench/seed.py --students 20000 --reset
+    python bench/loadtest.py --levels 1,8,32,64 --duration 20
+    python bench/loadtest.py --compare bench/results/<previous>.json
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from common import Client, git_revision, summarize
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def scenario_ips(client, nim):
+    status, _, elapsed = client.get(f"/api/acad/ips?nim={nim}")
+    return status, elapsed
+
+
+def scenario_nilai_matkul(client, nim):
+    status, _, elapsed = client.get(f"/api/acad/nilai-matkul?nim={nim}")
+    return status, elapsed
+
+
+def scenario_mahasiswa(client, nim):
+    status, _, elapsed = client.get(f"/api/acad/mahasiswa?limit=100&after={nim}")
+    return status, elapsed
+
+
+def scenario_dashboard(client, nim):
+    # what a browser does: login page, NIM check, dashboard page, its data
+    total = 0.0
+    steps = [
+        ("GET", "/login", None),
+        ("HEAD", f"/api/acad/mahasiswa/{nim}", None),
+        ("GET", f"/?nim={nim}", {"Cookie": f"session={nim}"}),
+        ("GET", f"/api/acad/dashboard?nim={nim}", None),
+    ]
+    for method, path, headers in steps:
+        status, _, elapsed = client.request(method, path, headers=headers)
+        total += elapsed
+        if status == 0 or status >= 500:
+            return status, total
+    return status, total
+
+
+SCENARIOS = {
+    "ips": scenario_ips,
+    "nilai-matkul": scenario_nilai_matkul,
+    "mahasiswa": scenario_mahasiswa,
+    "dashboard": scenario_dashboard,
+}
+
+
+def sample_nims(base_url, size, prefix):
+    client = Client(base_url)
+    nims = []
+    after = ""
+    while len(nims) < size:
+        path = "/api/acad/mahasiswa?limit=1000" + (f"&after={after}" if after else "")
+        status, payload, _ = client.get(path)
+        if status != 200:
+            raise SystemExit(f"cannot list students ({status}): {payload[:200]!r}")
+        page = json.loads(payload)
+        if not page:
+            break
+        nims.extend(row["nim"] for row in page if row["nim"].startswith(prefix))
+        after = page[-1]["nim"]
+    client.close()
+    if not nims:
+        raise SystemExit("no students found, seed the database first (bench/seed.py)")
+    return nims[:size]
+
+
+def run(base_url, scenario, nims, concurrency, duration, warmup):
+    fn = SCENARIOS[scenario]
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+
+    def worker(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        client = Client(base_url)
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    break
+                status, elapsed = fn(client, rng.choice(nims))
+                if now < measure_from:
+                    continue
+                with lock:
+                    latencies.append(elapsed)
+                    if status == 0 or status >= 500:
+                        errors += 1
+        finally:
+            client.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for seed in range(concurrency):
+            executor.submit(worker, seed)
+    return summarize(latencies, errors, duration)
+
+
+def server_stats(base_url):
+    client = Client(base_url)
+    stats = {}
+    for name in ("pool", "cache"):
+        status, payload, _ = client.get(f"/health/{name}")
+        if status == 200:
+            stats[name] = json.loads(payload)
+    client.close()
+    return stats
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    before = {(row["scenario"], row["concurrency"]): row for row in previous["results"]}
+    print()
+    print(f"compared with {previous['meta']['revision']} ({previous_path})")
+    print(f"{'scenario':<14} {'conc':>5} {'rps':>16} {'p95 ms':>18}")
+    for row in results:
+        old = before.get((row["scenario"], row["concurrency"]))
+        if old is None:
+            continue
+        rps_change = (row["rps"] / old["rps"] - 1) * 100 if old["rps"] else 0.0
+        p95_change = (row["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0.0
+        print(
+            f"{row['scenario']:<14} {row['concurrency']:>5} "
+            f"{old['rps']:>7.1f}>{row['rps']:<7.1f}{rps_change:+.0f}% "
+            f"{old['p95_ms']:>7.1f}>{row['p95_ms']:<7.1f}{p95_change:+.0f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:3002")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--levels", default="1,8,32")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--sample-size", type=int, default=2000)
+    parser.add_argument("--prefix", default="", help="hanya pakai NIM dengan awalan ini (mis. B dari seed.py)")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None, help="file JSON hasil run sebelumnya")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",")]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.levels.split(",")]
+
+    nims = sample_nims(args.base_url, args.sample_size, args.prefix)
+    print(f"{len(nims)} NIMs sampled, {args.duration:.0f}s per run after {args.warmup:.0f}s warmup")
+    print(f"{'scenario':<14} {'conc':>5} {'req':>8} {'err':>6} {'rps':>9} {'p50':>8} {'p95':>8} {'p99':>8}")
+
+    results = []
+    for scenario in scenarios:
+        for level in levels:
+            row = {"scenario": scenario, "concurrency": level}
+            row.update(run(args.base_url, scenario, nims, level, args.duration, args.warmup))
+            results.append(row)
+            print(
+                f"{scenario:<14} {level:>5} {row['requests']:>8} {row['errors']:>6} {row['rps']:>9.1f} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}"
+            )
+
+    revision = git_revision()
+    report = {
+        "meta": {
+            "revision": revision,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "base_url": args.base_url,
+            "args": vars(args),
+            "nims": len(nims),
+            "server": server_stats(args.base_url),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{revision}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
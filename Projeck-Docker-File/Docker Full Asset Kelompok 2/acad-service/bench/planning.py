@@ -0,0 +1,174 @@
+"""Planning time saved by prepared statements on the hot acad queries.
+
+Every --concurrency thread holds one connection, like a pooled connection
+under steady load, and runs each hot query --iterations times: first as a
+plain cursor.execute (parsed and planned on every call), then by name via
+PREPARE/EXECUTE the way prepared.StatementCache does. NIMs are drawn from
+the seeded data so the plans see realistic parameters. Planning time comes
+from EXPLAIN (ANALYZE, SUMMARY) on one connection after the loops, when
+Postgres has settled on the plan it keeps for the prepared statement.
+
+Needs the service's requirements (the queries are imported from main):
+
+    DB_HOST=localhost python bench/planning.py --iterations 2000 --concurrency 8
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+import psycopg2
+
+from common import db_config_from_env, percentile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import DASHBOARD_QUERY, IPS_QUERY, MAHASISWA_EXISTS_QUERY, NILAI_MATKUL_QUERY, VERSION_QUERY  # noqa: E402
+from prepared import Statement  # noqa: E402
+
+PLANNING_TIME = re.compile(r"Planning Time: ([\d.]+) ms")
+
+
+def hot_queries():
+    # same names and parameter shapes as the call sites in main.py
+    return [
+        ("krs_version", VERSION_QUERY, lambda nims: (nims[0],)),
+        ("ips", IPS_QUERY, lambda nims: ([nims[0]],)),
+        ("ips_batch", IPS_QUERY, lambda nims: (nims,)),
+        ("nilai_matkul", NILAI_MATKUL_QUERY, lambda nims: (nims[0],)),
+        ("dashboard", DASHBOARD_QUERY, lambda nims: (nims[0],)),
+        ("mahasiswa_exists", MAHASISWA_EXISTS_QUERY, lambda nims: (nims[0],)),
+    ]
+
+
+def sample_nims(config, count):
+    conn = psycopg2.connect(**config)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT nim FROM krs_version ORDER BY random() LIMIT %s", (count,))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def run_loop(config, sql, make_params, nims, iterations, batch, prepare_sql, latencies, barrier):
+    rng = random.Random()
+    conn = psycopg2.connect(**config)
+    try:
+        cursor = conn.cursor()
+        if prepare_sql is not None:
+            cursor.execute(prepare_sql)
+            conn.commit()
+        barrier.wait()
+        local = []
+        for _ in range(iterations):
+            params = make_params(rng.sample(nims, batch))
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            conn.commit()
+            local.append(time.perf_counter() - started)
+        latencies.extend(local)
+    finally:
+        conn.close()
+
+
+def measure(config, sql, make_params, nims, iterations, concurrency, batch, prepare_sql=None):
+    latencies = []
+    barrier = threading.Barrier(concurrency + 1)
+    threads = [
+        threading.Thread(
+            target=run_loop,
+            args=(config, sql, make_params, nims, iterations, batch, prepare_sql, latencies, barrier),
+        )
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return {
+        "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "qps": len(latencies) / wall if wall else 0.0,
+    }
+
+
+def planning_ms(cursor, sql, params, samples):
+    total = 0.0
+    for _ in range(samples):
+        cursor.execute(f"EXPLAIN (ANALYZE, SUMMARY) {sql}", params)
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+        match = PLANNING_TIME.search(plan)
+        total += float(match.group(1)) if match else 0.0
+    return total / samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1000, help="query per thread per mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="thread, masing-masing satu koneksi")
+    parser.add_argument("--batch", type=int, default=100, help="NIM per panggilan ips_batch")
+    parser.add_argument("--samples", type=int, default=50, help="EXPLAIN per pengukuran planning")
+    parser.add_argument("--queries", default=None, help="nama query dipisah koma, default semua")
+    args = parser.parse_args()
+
+    config = db_config_from_env()
+    nims = sample_nims(config, max(args.batch, 1000))
+    if len(nims) < args.batch:
+        sys.exit("not enough students in krs_version, run bench/seed.py first")
+
+    queries = hot_queries()
+    if args.queries:
+        wanted = set(args.queries.split(","))
+        queries = [query for query in queries if query[0] in wanted]
+
+    conn = psycopg2.connect(**config)
+    cursor = conn.cursor()
+    cursor.execute("SHOW plan_cache_mode")
+    print(f"plan_cache_mode={cursor.fetchone()[0]} concurrency={args.concurrency} iterations={args.iterations}")
+    print(f"{'query':<18} {'mode':<9} {'mean ms':>9} {'p95 ms':>9} {'qps':>9} {'plan ms':>9}")
+    try:
+        for name, query, make_params in queries:
+            # rng.sample(nims, batch) only matters for ips_batch; the others
+            # take the first NIM of the sample
+            batch = args.batch if name == "ips_batch" else 1
+            statement = Statement(name, query)
+            params = make_params(nims[:batch])
+            load = (nims, args.iterations, args.concurrency, batch)
+
+            plain = measure(config, query, make_params, *load)
+            prepared = measure(config, statement.execute_sql, make_params, *load, statement.prepare_sql)
+
+            plain["plan_ms"] = planning_ms(cursor, query, params, args.samples)
+            cursor.execute(statement.prepare_sql)
+            # past the first executions Postgres may switch to a cached
+            # generic plan; warm up so the sample reflects steady state
+            for _ in range(10):
+                cursor.execute(statement.execute_sql, params)
+            prepared["plan_ms"] = planning_ms(cursor, statement.execute_sql, params, args.samples)
+            cursor.execute(f"DEALLOCATE {statement.name}")
+            conn.rollback()
+
+            for mode, result in (("plain", plain), ("prepared", prepared)):
+                print(
+                    f"{name:<18} {mode:<9} {result['mean_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+                    f"{result['qps']:>9.0f} {result['plan_ms']:>9.3f}"
+                )
+            print(
+                f"{name:<18} {'saved':<9} {plain['mean_ms'] - prepared['mean_ms']:>9.3f} "
+                f"{'':>9} {'':>9} {plain['plan_ms'] - prepared['plan_ms']:>9.3f}"
+            )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Seed PostgreSQL with a synthetic acad dataset for benchmarking.
+
+Students are spread over jurusan and angkatan; each takes a fixed number of
+courses per completed semester, so KRS volume grows the way a real faculty
+does (older angkatan have more rows). Generated rows use --prefix for nim
+and kode_mk, so --reset removes them without touching real data.
+
+The schema must already exist (db_kelas.sql + migrations, which the
+service applies at startup):
+
+    DB_HOST=localhost python bench/seed.py --students 20000 --reset
+"""
+
+import argparse
+import random
+import time
+
+import psycopg2
+
+from common import db_config_from_env
+
+GRADES = ["A", "A-", "B+", "B", "B-", "C+", "C", "D", "E"]
+GRADE_WEIGHTS = [25, 12, 15, 18, 8, 7, 8, 4, 3]
+BOBOT = [4.0, 3.75, 3.5, 3.0, 2.75, 2.5, 2.0, 1.0, 0.0]
+
+
+class LineFile:
+    # file-like over a generator of CSV lines, so COPY streams rows as they
+    # are generated instead of building the whole file in memory
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            data, self._buffer = self._buffer, ""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def build_dataset(args, rng):
+    jurusan = [name.strip() for name in args.jurusan.split(",")]
+    first, last = (int(year) for year in args.angkatan.split("-"))
+    angkatan = list(range(first, last + 1))
+
+    courses = []
+    for i in range(args.courses):
+        semester = i % args.semesters + 1
+        courses.append((f"{args.prefix}MK{i:04d}", f"Mata Kuliah {i}", rng.choice([2, 3, 3, 3, 4]), semester))
+    by_semester = {}
+    for kode_mk, _, _, semester in courses:
+        by_semester.setdefault(semester, []).append(kode_mk)
+
+    students = []
+    for i in range(args.students):
+        year = rng.choice(angkatan)
+        nim = f"{args.prefix}{year % 100:02d}{i:05d}"
+        students.append((nim, f"Mahasiswa {i}", rng.choice(jurusan), year))
+    return courses, by_semester, students
+
+
+def krs_lines(args, rng, students, by_semester):
+    for nim, _, _, year in students:
+        completed = max(1, min(args.semesters, (args.reference_year - year) * 2))
+        for semester in range(1, completed + 1):
+            pool = by_semester.get(semester, [])
+            for kode_mk in rng.sample(pool, min(args.courses_per_semester, len(pool))):
+                nilai = rng.choices(GRADES, GRADE_WEIGHTS)[0]
+                yield f"{nim},{kode_mk},{nilai},{semester}\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--courses", type=int, default=240)
+    parser.add_argument("--semesters", type=int, default=8)
+    parser.add_argument("--courses-per-semester", type=int, default=7)
+    parser.add_argument("--jurusan", default="Sains Data,Informatika,Statistika,Matematika")
+    parser.add_argument("--angkatan", default="2018-2024")
+    parser.add_argument("--reference-year", type=int, default=2025)
+    parser.add_argument("--prefix", default="B")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="hapus data sintetis sebelumnya dulu")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    courses, by_semester, students = build_dataset(args, rng)
+    pattern = args.prefix + "%"
+
+    conn = psycopg2.connect(**db_config_from_env())
+    try:
+        cursor = conn.cursor()
+        started = time.perf_counter()
+
+        if args.reset:
+            cursor.execute("DELETE FROM krs WHERE nim LIKE %s", (pattern,))
+            cursor.execute("DELETE FROM mahasiswa WHERE nim LIKE %s", (pattern,))
+            cursor.execute("DELETE FROM mata_kuliah WHERE kode_mk LIKE %s", (args.prefix + "MK%",))
+
+        cursor.executemany(
+            "INSERT INTO bobot_nilai (nilai, bobot) VALUES (%s, %s) ON CONFLICT (nilai) DO NOTHING",
+            list(zip(GRADES, BOBOT)),
+        )
+        cursor.copy_expert(
+            "COPY mata_kuliah (kode_mk, nama_mk, sks) FROM STDIN WITH (FORMAT csv)",
+            LineFile(f"{kode_mk},{nama},{sks}\n" for kode_mk, nama, sks, _ in courses),
+        )
+        cursor.copy_expert(
+            "COPY mahasiswa (nim, nama, jurusan, angkatan) FROM STDIN WITH (FORMAT csv)",
+            LineFile(f"{nim},{nama},{jurusan},{year}\n" for nim, nama, jurusan, year in students),
+        )
+        # one COPY = one statement, so the ips_summary trigger runs once
+        cursor.copy_expert(
+            "COPY krs (nim, kode_mk, nilai, semester) FROM STDIN WITH (FORMAT csv)",
+            LineFile(krs_lines(args, rng, students, by_semester)),
+        )
+        krs_rows = cursor.rowcount
+        conn.commit()
+
+        conn.autocommit = True
+        cursor.execute("ANALYZE mahasiswa")
+        cursor.execute("ANALYZE mata_kuliah")
+        cursor.execute("ANALYZE krs")
+        cursor.execute("ANALYZE ips_summary")
+    finally:
+        conn.close()
+
+    print(
+        f"seeded {len(students)} students, {len(courses)} courses, {krs_rows} krs rows "
+        f"in {time.perf_counter() - started:.1f}s (prefix {args.prefix!r}, seed {args.seed})"
+    )
+
+
+if __name__ == "__main__":
+    main()
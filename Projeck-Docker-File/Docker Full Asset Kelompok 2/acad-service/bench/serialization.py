@@ -0,0 +1,125 @@
+"""Microbenchmark for the API response path: JSON encoding and gzip.
+
+Builds synthetic payloads shaped like /api/acad/mahasiswa pages and
+/api/acad/nilai-matkul grade lists, then times each encoder on them
+without a server or database:
+
+    json       json.dumps, what starlette's JSONResponse does
+    fastapi    jsonable_encoder + json.dumps, a plain dict/list return value
+    orjson     orjson.dumps, what ORJSONResponse does when returned directly
+
+and gzip at a few levels on the orjson output. Encoders whose package is
+not installed are skipped.
+
+    python bench/serialization.py --rows 1000,10000
+"""
+
+import argparse
+import gzip
+import json
+import random
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from fastapi.encoders import jsonable_encoder
+except ImportError:
+    jsonable_encoder = None
+
+GRADES = ["A", "A-", "B+", "B", "B-", "C+", "C", "D", "E"]
+JURUSAN = ["Informatika", "Sistem Informasi", "Teknik Elektro", "Matematika"]
+
+
+def mahasiswa_rows(count, rng):
+    return [
+        {
+            "nim": f"B{index:08d}",
+            "nama": f"Mahasiswa {index}",
+            "jurusan": rng.choice(JURUSAN),
+            "angkatan": rng.randint(2018, 2024),
+        }
+        for index in range(count)
+    ]
+
+
+def nilai_rows(count, rng):
+    return [
+        {
+            "nim": "Mahasiswa 1",
+            "kode_mk": f"BMK{index % 400:04d}",
+            "nama_mk": f"Mata Kuliah {index % 400}",
+            "sks": rng.randint(2, 4),
+            "nilai": rng.choice(GRADES),
+            "semester": index % 8 + 1,
+        }
+        for index in range(count)
+    ]
+
+
+def encoders():
+    result = {
+        "json": lambda data: json.dumps(
+            data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8"),
+    }
+    if jsonable_encoder is not None:
+        result["fastapi"] = lambda data: json.dumps(
+            jsonable_encoder(data), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+    if orjson is not None:
+        result["orjson"] = orjson.dumps
+    return result
+
+
+def timeit(fn, arg, min_time):
+    # repeat until min_time has passed, report the best run
+    best = float("inf")
+    runs = 0
+    started = time.perf_counter()
+    while runs < 3 or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+        runs += 1
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="1000,10000")
+    parser.add_argument("--levels", default="1,6,9", help="level gzip yang diukur")
+    parser.add_argument("--min-time", type=float, default=1.0, help="detik per pengukuran")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    sizes = [int(size) for size in args.rows.split(",")]
+    levels = [int(level) for level in args.levels.split(",")]
+    payloads = {"mahasiswa": mahasiswa_rows, "nilai": nilai_rows}
+    available = encoders()
+
+    print(f"{'payload':<10} {'rows':>6} {'encoder':<10} {'ms':>9} {'us/row':>8} {'bytes':>10}")
+    for name, build in payloads.items():
+        for size in sizes:
+            data = build(size, rng)
+            for encoder, fn in available.items():
+                seconds = timeit(fn, data, args.min_time)
+                print(
+                    f"{name:<10} {size:>6} {encoder:<10} {seconds * 1000:>9.3f} "
+                    f"{seconds * 1e6 / size:>8.2f} {len(fn(data)):>10}"
+                )
+            body = available.get("orjson", available["json"])(data)
+            for level in levels:
+                seconds = timeit(lambda raw: gzip.compress(raw, compresslevel=level), body, args.min_time)
+                compressed = len(gzip.compress(body, compresslevel=level))
+                print(
+                    f"{name:<10} {size:>6} {f'gzip-{level}':<10} {seconds * 1000:>9.3f} "
+                    f"{seconds * 1e6 / size:>8.2f} {compressed:>10}"
+                )
+
+
+if __name__ == "__main__":
+    main()
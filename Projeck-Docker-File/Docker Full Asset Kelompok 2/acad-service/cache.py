@@ -0,0 +1,157 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class CacheLoadCancelled(Exception):
+    pass
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "tags")
+
+    def __init__(self, value, expires_at, tags):
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class _Inflight:
+    __slots__ = ("future", "tags")
+
+    def __init__(self, future, tags):
+        self.future = future
+        self.tags = tags
+
+
+class ResponseCache:
+    # Not thread-safe: every method must run on the event loop thread.
+    # Code running on the DB executor should hop back with
+    # loop.call_soon_threadsafe before invalidating.
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._inflight = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, key, loader, ttl, tags=(), tags_of=None):
+        if ttl <= 0 or self.max_entries <= 0:
+            return await loader()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            self._remove(key)
+            self.expirations += 1
+
+        # single-flight: concurrent misses for the same key share one load
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight.future)
+            except CacheLoadCancelled:
+                # the leading request went away (client disconnect), not the
+                # load itself failing: the first follower to wake takes over
+                return await self.get_or_load(key, loader, ttl, tags, tags_of)
+
+        self.misses += 1
+        inflight = _Inflight(asyncio.get_running_loop().create_future(), set(tags))
+        self._inflight[key] = inflight
+        try:
+            value = await loader()
+        except BaseException as e:
+            if self._inflight.get(key) is inflight:
+                del self._inflight[key]
+            if isinstance(e, Exception):
+                inflight.future.set_exception(e)
+            else:
+                inflight.future.set_exception(CacheLoadCancelled(key))
+            # mark the exception as retrieved when nobody else was waiting
+            inflight.future.exception()
+            raise
+
+        # an invalidation during the load drops the in-flight marker, the
+        # (possibly stale) value is then returned but not stored
+        if self._inflight.get(key) is inflight:
+            del self._inflight[key]
+            entry_tags = inflight.tags | set(tags_of(value) if tags_of else ())
+            self._store(key, value, ttl, entry_tags)
+        inflight.future.set_result(value)
+        return value
+
+    def _store(self, key, value, ttl, tags):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, time.monotonic() + ttl, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, tag):
+        keys = self._tags.pop(tag, set())
+        for key in list(keys):
+            self._remove(key)
+
+        for key, inflight in list(self._inflight.items()):
+            if tag in inflight.tags:
+                del self._inflight[key]
+
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def discard(self, key):
+        self._inflight.pop(key, None)
+        if key not in self._entries:
+            return 0
+        self._remove(key)
+        self.invalidations += 1
+        return 1
+
+    def clear(self):
+        removed = len(self._entries)
+        self._entries.clear()
+        self._tags.clear()
+        self._inflight.clear()
+        self.invalidations += removed
+        return removed
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
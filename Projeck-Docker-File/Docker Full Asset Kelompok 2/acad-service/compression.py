@@ -0,0 +1,30 @@
+from starlette.middleware.gzip import GZipMiddleware
+
+
+class ApiGZipMiddleware:
+    # gzip only under the given path prefixes: the HTML pages are already
+    # served precompressed by pages.StaticPage and must not be encoded twice.
+    # Bodies below minimum_size go out as-is, compressing them costs more
+    # CPU than it saves on the wire.
+    def __init__(self, app, minimum_size=1024, compresslevel=6, prefixes=("/api/",)):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] == "http"
+            and scope["path"].startswith(self.prefixes)
+            and not _wants_event_stream(scope)
+        ):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+def _wants_event_stream(scope):
+    # gzip buffers small writes, which would hold SSE events back
+    for name, value in scope["headers"]:
+        if name == b"accept" and b"text/event-stream" in value:
+            return True
+    return False
@@ -0,0 +1,284 @@
+import threading
+import time
+from collections import deque
+
+import psycopg2
+import psycopg2.extensions
+
+# libpq TCP keepalives, so reads on a connection to a host that vanished
+# without a FIN fail after about a minute instead of hanging
+KEEPALIVES = {
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 3,
+}
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PoolClosed(Exception):
+    pass
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    # psycopg2 connections have no __dict__, the subclass lets the pool
+    # keep its bookkeeping on the connection object itself
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # names PREPAREd in this session, see prepared.StatementCache
+        self.prepared = set()
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        db_config,
+        minconn=1,
+        maxconn=10,
+        timeout=5.0,
+        max_idle=300.0,
+        max_lifetime=3600.0,
+        check_interval=5.0,
+        on_connect=None,
+        on_acquire=None,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("invalid pool size: min=%s max=%s" % (minconn, maxconn))
+
+        self.db_config = dict(db_config)
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        # optional timing hooks, called with the elapsed seconds
+        self.on_connect = on_connect
+        self.on_acquire = on_acquire
+
+        self._cond = threading.Condition()
+        # LIFO: the most recently used connection is handed out first, so
+        # surplus connections stay idle long enough to be reaped
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._last_reap = time.monotonic()
+
+        self._acquired = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._broken = 0
+
+    def _connect(self):
+        started = time.monotonic()
+        conn = psycopg2.connect(connection_factory=PooledConnection, **self.db_config)
+        if self.on_connect is not None:
+            self.on_connect(time.monotonic() - started)
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _discard(self, conn, reason):
+        self._close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            if reason == "recycled":
+                self._recycled += 1
+            else:
+                self._broken += 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn, now):
+        if conn.closed:
+            return False
+        if self.max_lifetime and now - conn.created_at > self.max_lifetime:
+            return False
+        if now - conn.last_used < self.check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolClosed("connection pool is closed")
+                    if self._idle:
+                        conn = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            "no database connection available after %.1fs" % timeout
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, time.monotonic()):
+                self._discard(conn, "recycled")
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._acquired += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            if self.on_acquire is not None:
+                self.on_acquire(waited)
+            return conn
+
+    def putconn(self, conn, broken=False):
+        if not broken and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    broken = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                broken = True
+
+        if broken or conn.closed:
+            self._discard(conn, "broken")
+            return
+
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                self._cond.notify()
+                self._close_quietly(conn)
+                return
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+            self._cond.notify()
+
+        self._reap()
+
+    def _reap(self):
+        now = time.monotonic()
+        if now - self._last_reap < 1.0:
+            return
+
+        expired = []
+        with self._cond:
+            self._last_reap = now
+            # oldest idle connections sit at the left end of the deque
+            while self._idle and self._size - len(expired) > self.minconn:
+                conn = self._idle[0]
+                idle_for = now - conn.last_used
+                too_old = self.max_lifetime and now - conn.created_at > self.max_lifetime
+                if idle_for < self.max_idle and not too_old:
+                    break
+                expired.append(self._idle.popleft())
+            self._size -= len(expired)
+            self._recycled += len(expired)
+
+        for conn in expired:
+            self._close_quietly(conn)
+
+    def prewarm(self):
+        opened = []
+        try:
+            while True:
+                with self._cond:
+                    if self._size >= self.minconn:
+                        break
+                    self._size += 1
+                try:
+                    opened.append(self._connect())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                    raise
+        finally:
+            now = time.monotonic()
+            with self._cond:
+                for conn in opened:
+                    conn.last_used = now
+                    self._idle.append(conn)
+                self._cond.notify_all()
+        return len(opened)
+
+    def close(self, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+        # connections still checked out are closed by putconn when their
+        # request finishes; wait for them so shutdown does not cut queries
+        with self._cond:
+            while self._size > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self._size
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "min": self.minconn,
+                "max": self.maxconn,
+                "size": self._size,
+                "in_use": self._size - idle,
+                "idle": idle,
+                "waiting": self._waiting,
+                "acquired": self._acquired,
+                "wait_time_avg_ms": round(self._wait_total / self._acquired * 1000, 3)
+                if self._acquired
+                else 0.0,
+                "wait_time_max_ms": round(self._wait_max * 1000, 3),
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "broken": self._broken,
+                "closed": self._closed,
+            }
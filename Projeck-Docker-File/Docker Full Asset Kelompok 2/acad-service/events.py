@@ -0,0 +1,195 @@
+import asyncio
+
+import psycopg2
+import psycopg2.extensions
+
+from admission import Overloaded
+from db_pool import KEEPALIVES
+
+# channel dan format payload dari migrations/0004_krs_version_notify.sql
+CHANNEL = "krs_version"
+
+
+
+def parse_payload(payload):
+    changes = []
+    for item in payload.split(","):
+        nim, _, version = item.rpartition(":")
+        if nim and version.isdigit():
+            changes.append((nim, int(version)))
+    return changes
+
+
+class NotifyListener:
+    # One dedicated autocommit connection LISTENing on the channel, shared by
+    # the whole worker. It is driven by the event loop's selector (add_reader)
+    # rather than a thread, so on_changes runs on the loop and may touch the
+    # response cache directly. After a lost connection it reconnects with
+    # backoff and calls on_reconnect: notifications sent in between are gone.
+    def __init__(self, db_config, on_changes, on_reconnect=None, channel=CHANNEL, retry_max=30.0, log=print):
+        # a listener that only ever reads would otherwise not notice a
+        # connection that died without a FIN
+        self.db_config = dict(db_config, **KEEPALIVES)
+        self.on_changes = on_changes
+        self.on_reconnect = on_reconnect
+        self.channel = channel
+        self.retry_max = retry_max
+        self.log = log
+
+        self.connected = False
+        self.notifications = 0
+        self.changes = 0
+        self.reconnects = 0
+        self._closed = False
+        self._lost = None
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.db_config)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        conn.cursor().execute(f"LISTEN {self.channel}")
+        return conn
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        delay = 1.0
+        connected_before = False
+        while not self._closed:
+            try:
+                conn = await loop.run_in_executor(None, self._connect)
+            except Exception as e:
+                self.log(f"LISTEN {self.channel} failed: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.retry_max)
+                continue
+
+            delay = 1.0
+            if connected_before:
+                self.reconnects += 1
+                if self.on_reconnect is not None:
+                    self.on_reconnect()
+            connected_before = True
+            self.connected = True
+            try:
+                error = await self._listen(loop, conn)
+                if error is not None:
+                    self.log(f"LISTEN {self.channel} connection lost: {error}")
+            finally:
+                self.connected = False
+                conn.close()
+
+    async def _listen(self, loop, conn):
+        lost = self._lost = loop.create_future()
+        fileno = conn.fileno()
+
+        def on_readable():
+            try:
+                conn.poll()
+            except Exception as e:
+                if not lost.done():
+                    lost.set_result(e)
+                return
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                changes = parse_payload(notify.payload)
+                self.notifications += 1
+                self.changes += len(changes)
+                try:
+                    self.on_changes(changes)
+                except Exception as e:
+                    self.log(f"{self.channel} handler error: {e}")
+
+        loop.add_reader(fileno, on_readable)
+        try:
+            return await lost
+        finally:
+            loop.remove_reader(fileno)
+
+    def close(self):
+        self._closed = True
+        if self._lost is not None and not self._lost.done():
+            self._lost.set_result(None)
+
+    def stats(self):
+        return {
+            "channel": self.channel,
+            "connected": self.connected,
+            "notifications": self.notifications,
+            "changes": self.changes,
+            "reconnects": self.reconnects,
+        }
+
+
+class EventHub:
+    # Fan-out of krs_version changes to SSE subscribers, event-loop only.
+    # Every subscriber has a one-slot queue holding the newest version: a
+    # slow client skips intermediate versions instead of buffering them.
+    def __init__(self, max_connections=1000, max_per_nim=5, retry_after=5):
+        self.max_connections = max_connections
+        self.max_per_nim = max_per_nim
+        self.retry_after = retry_after
+        self._subscribers = {}
+        self._count = 0
+        self.closed = False
+
+        self.published = 0
+        self.delivered = 0
+        self.rejected = 0
+
+    def subscribe(self, nim):
+        subscribers = self._subscribers.get(nim, ())
+        if self.closed:
+            reason = "shutting down"
+        elif self._count >= self.max_connections:
+            reason = "too many event streams"
+        elif len(subscribers) >= self.max_per_nim:
+            reason = "too many event streams for this NIM"
+        else:
+            queue = asyncio.Queue(maxsize=1)
+            self._subscribers.setdefault(nim, set()).add(queue)
+            self._count += 1
+            return queue
+        self.rejected += 1
+        raise Overloaded("events", reason, self.retry_after)
+
+    def unsubscribe(self, nim, queue):
+        # idempotent: the stream's finally and its weakref finalizer both call it
+        subscribers = self._subscribers.get(nim)
+        if subscribers is None or queue not in subscribers:
+            return
+        subscribers.discard(queue)
+        self._count -= 1
+        if not subscribers:
+            del self._subscribers[nim]
+
+    def _offer(self, queue, item):
+        if queue.full() and queue.get_nowait() is None:
+            # never replace the None sentinel from close(), it ends the stream
+            item = None
+        queue.put_nowait(item)
+
+    def publish(self, nim, version):
+        if self.closed:
+            return
+        self.published += 1
+        for queue in self._subscribers.get(nim, ()):
+            self._offer(queue, version)
+            self.delivered += 1
+
+    def close(self):
+        # None ends every open stream, e.g. while draining before shutdown
+        self.closed = True
+        for subscribers in self._subscribers.values():
+            for queue in subscribers:
+                self._offer(queue, None)
+
+    def stats(self):
+        return {
+            "connections": self._count,
+            "nims": len(self._subscribers),
+            "max_connections": self.max_connections,
+            "max_per_nim": self.max_per_nim,
+            "published": self.published,
+            "delivered": self.delivered,
+            "rejected": self.rejected,
+            "closed": self.closed,
+        }
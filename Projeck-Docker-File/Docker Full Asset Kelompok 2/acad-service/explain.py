@@ -0,0 +1,85 @@
+import argparse
+import re
+
+import psycopg2
+
+from analytics import cohort_query
+from main import (
+    COURSE_NIMS_QUERY,
+    DASHBOARD_QUERY,
+    DB_CONFIG,
+    IPS_QUERY,
+    NILAI_MATKUL_QUERY,
+    VERSION_QUERY,
+    mahasiswa_query,
+)
+
+SCAN_NODE = re.compile(r"((?:Parallel )?(?:Seq|Index|Index Only|Bitmap Heap|Bitmap Index) Scan)(?: using (\S+))? on (\S+)")
+
+
+def sample_params(cursor, nim, kode_mk):
+    if nim is None:
+        cursor.execute("SELECT nim FROM krs WHERE nim IS NOT NULL ORDER BY nim LIMIT 1")
+        row = cursor.fetchone()
+        nim = row[0] if row else "22001"
+    if kode_mk is None:
+        cursor.execute("SELECT kode_mk FROM krs WHERE nim = %s LIMIT 1", (nim,))
+        row = cursor.fetchone()
+        kode_mk = row[0] if row else "IF101"
+    cursor.execute("SELECT jurusan, angkatan FROM mahasiswa WHERE nim = %s", (nim,))
+    row = cursor.fetchone() or (None, None)
+    return nim, kode_mk, row[0], row[1]
+
+
+def endpoint_queries(nim, kode_mk, jurusan, angkatan):
+    page_query, page_params = mahasiswa_query(None, None, None, 101)
+    filtered_query, filtered_params = mahasiswa_query(nim, jurusan, angkatan, 101)
+    return [
+        ("conditional GET (If-None-Match)", VERSION_QUERY, (nim,)),
+        ("GET /api/acad/ips", IPS_QUERY, ([nim],)),
+        ("POST /api/acad/ips/batch", IPS_QUERY, ([nim] * 100,)),
+        ("GET /api/acad/nilai-matkul", NILAI_MATKUL_QUERY, (nim,)),
+        ("GET /api/acad/dashboard", DASHBOARD_QUERY, (nim,)),
+        ("GET /api/acad/mahasiswa", page_query, page_params),
+        ("GET /api/acad/mahasiswa?jurusan&angkatan&after", filtered_query, filtered_params),
+        ("POST /api/acad/cache/invalidate (kode_mk)", COURSE_NIMS_QUERY, (kode_mk,)),
+        ("GET /api/acad/analytics/cohort", *cohort_query(None, None, None)),
+        ("GET /api/acad/analytics/cohort?jurusan&angkatan", *cohort_query(jurusan, angkatan, None)),
+        ("krs trigger: refresh_ips_summary", "SELECT * FROM ips_summary_raw WHERE nim = ANY(%s)", ([nim],)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cetak EXPLAIN untuk query setiap endpoint")
+    parser.add_argument("--nim", default=None)
+    parser.add_argument("--kode-mk", default=None)
+    parser.add_argument("--analyze", action="store_true", help="EXPLAIN (ANALYZE, BUFFERS), query benar-benar dijalankan")
+    args = parser.parse_args()
+
+    options = "ANALYZE, BUFFERS" if args.analyze else "COSTS"
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        cursor = conn.cursor()
+        params = sample_params(cursor, args.nim, args.kode_mk)
+        print(f"sample nim={params[0]} kode_mk={params[1]} jurusan={params[2]} angkatan={params[3]}")
+
+        for name, query, query_params in endpoint_queries(*params):
+            cursor.execute(f"EXPLAIN ({options}) {query}", query_params)
+            plan = [row[0] for row in cursor.fetchall()]
+            scans = sorted({
+                f"{node} on {table}" + (f" using {index}" if index else "")
+                for node, index, table in SCAN_NODE.findall("\n".join(plan))
+            })
+
+            print()
+            print(f"=== {name}")
+            print("\n".join(plan))
+            print("scans: " + ("; ".join(scans) or "-"))
+        # EXPLAIN ANALYZE runs the statements; never keep their effects
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
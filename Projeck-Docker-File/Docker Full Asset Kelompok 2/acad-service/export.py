@@ -0,0 +1,180 @@
+import queue
+import threading
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+COLUMNS = ("nim", "nama", "jurusan", "angkatan", "semester", "kode_mk", "nama_mk", "sks", "nilai")
+
+# Data transkrip lengkap, satu baris per krs
+TRANSKRIP_QUERY = """
+    SELECT m.nim, m.nama, m.jurusan, m.angkatan, krs.semester,
+           mk.kode_mk, mk.nama_mk, mk.sks, krs.nilai
+    FROM mahasiswa m
+    JOIN krs ON krs.nim = m.nim
+    JOIN mata_kuliah mk ON mk.kode_mk = krs.kode_mk
+    {where}
+    ORDER BY m.nim, krs.semester, mk.kode_mk
+"""
+
+_DONE = object()
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def transkrip_query(jurusan, angkatan, semester):
+    clauses = []
+    params = []
+    if jurusan is not None:
+        clauses.append("m.jurusan = %s")
+        params.append(jurusan)
+    if angkatan is not None:
+        clauses.append("m.angkatan = %s")
+        params.append(angkatan)
+    if semester is not None:
+        clauses.append("krs.semester = %s")
+        params.append(semester)
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    return TRANSKRIP_QUERY.format(where=where), params
+
+
+def _put(chunks, cancelled, item):
+    while not cancelled.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+    raise ExportCancelled()
+
+
+class _ChunkWriter:
+    # copy_expert calls write() once per row; rows are batched into
+    # chunk_size pieces before they go through the bounded queue
+    def __init__(self, chunks, cancelled, chunk_size):
+        self._chunks = chunks
+        self._cancelled = cancelled
+        self._chunk_size = chunk_size
+        self._parts = []
+        self._size = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self._parts.append(data)
+        self._size += len(data)
+        if self._size >= self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            _put(self._chunks, self._cancelled, b"".join(self._parts))
+            self._parts = []
+            self._size = 0
+
+
+def copy_csv_chunks(get_connection, executor, query, params, chunk_size=64 * 1024, max_chunks=16):
+    # COPY ... TO STDOUT runs on the DB executor and hands chunks over a
+    # bounded queue; when the client reads slowly the COPY blocks instead
+    # of the whole export piling up in memory
+    chunks = queue.Queue(maxsize=max_chunks)
+    cancelled = threading.Event()
+
+    def run():
+        try:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                # COPY does not take bind parameters, mogrify quotes them
+                select = cursor.mogrify(query, params).decode()
+                writer = _ChunkWriter(chunks, cancelled, chunk_size)
+                cursor.copy_expert(f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER true)", writer)
+                writer.flush()
+            _put(chunks, cancelled, _DONE)
+        except ExportCancelled:
+            pass
+        except BaseException as e:
+            try:
+                _put(chunks, cancelled, e)
+            except ExportCancelled:
+                pass
+
+    executor.submit(run)
+    try:
+        while True:
+            item = chunks.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # client went away (or we finished): unblock and stop the COPY
+        cancelled.set()
+
+
+class _DrainSink:
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def arrow_schema():
+    return pa.schema([
+        ("nim", pa.string()),
+        ("nama", pa.string()),
+        ("jurusan", pa.string()),
+        ("angkatan", pa.int32()),
+        ("semester", pa.int32()),
+        ("kode_mk", pa.string()),
+        ("nama_mk", pa.string()),
+        ("sks", pa.int32()),
+        ("nilai", pa.string()),
+    ])
+
+
+def arrow_chunks(get_connection, query, params, batch_size=10000):
+    # Arrow IPC stream: one record batch per server-side cursor fetch
+    schema = arrow_schema()
+    sink = _DrainSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    with get_connection() as conn:
+        cursor = conn.cursor(name="transkrip_export")
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            batch = pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema,
+            )
+            writer.write_batch(batch)
+            yield sink.drain()
+        cursor.close()
+    writer.close()
+    yield sink.drain()
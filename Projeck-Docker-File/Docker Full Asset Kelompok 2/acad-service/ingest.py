@@ -0,0 +1,204 @@
+import argparse
+import csv
+import io
+import json
+import time
+
+import psycopg2
+
+COLUMNS = ("nim", "kode_mk", "nilai", "semester")
+
+# Satu baris per (nim, kode_mk, semester). Data disalin ke tabel staging
+# sementara lalu divalidasi dan di-upsert ke krs dalam satu transaksi.
+STAGING_DDL = """
+    CREATE TEMP TABLE krs_staging (
+        nim TEXT,
+        kode_mk TEXT,
+        nilai TEXT,
+        semester INT
+    ) ON COMMIT DROP
+"""
+
+COPY_CSV = "COPY krs_staging (nim, kode_mk, nilai, semester) FROM STDIN WITH (FORMAT csv, HEADER MATCH)"
+
+VALIDATE_QUERY = """
+    SELECT 'nilai tidak dikenal', s.nilai, count(*)
+    FROM krs_staging s
+    WHERE NOT EXISTS (SELECT 1 FROM bobot_nilai b WHERE b.nilai = s.nilai)
+    GROUP BY s.nilai
+    UNION ALL
+    SELECT 'kode_mk tidak dikenal', s.kode_mk, count(*)
+    FROM krs_staging s
+    WHERE NOT EXISTS (SELECT 1 FROM mata_kuliah mk WHERE mk.kode_mk = s.kode_mk)
+    GROUP BY s.kode_mk
+    UNION ALL
+    SELECT 'nim tidak dikenal', s.nim, count(*)
+    FROM krs_staging s
+    WHERE NOT EXISTS (SELECT 1 FROM mahasiswa m WHERE m.nim = s.nim)
+    GROUP BY s.nim
+    UNION ALL
+    SELECT 'semester kosong', NULL, count(*)
+    FROM krs_staging
+    WHERE semester IS NULL
+    HAVING count(*) > 0
+    UNION ALL
+    SELECT 'baris ganda', nim || '/' || kode_mk || '/' || semester, count(*)
+    FROM krs_staging
+    GROUP BY nim, kode_mk, semester
+    HAVING count(*) > 1
+    LIMIT %s
+"""
+
+# krs tidak punya unique key atas (nim, kode_mk, semester): satu baris staging
+# bisa mengubah beberapa baris ganda di krs, jadi yang dihitung adalah baris
+# staging yang berubah (staging sendiri sudah dijamin unik oleh validasi)
+UPDATE_QUERY = """
+    WITH changed AS (
+        UPDATE krs
+        SET nilai = s.nilai
+        FROM krs_staging s
+        WHERE krs.nim = s.nim
+          AND krs.kode_mk = s.kode_mk
+          AND krs.semester = s.semester
+          AND krs.nilai IS DISTINCT FROM s.nilai
+        RETURNING krs.nim, krs.kode_mk, krs.semester
+    )
+    SELECT count(*) FROM (SELECT DISTINCT nim, kode_mk, semester FROM changed) c
+"""
+
+INSERT_QUERY = """
+    INSERT INTO krs (nim, kode_mk, nilai, semester)
+    SELECT s.nim, s.kode_mk, s.nilai, s.semester
+    FROM krs_staging s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM krs
+        WHERE krs.nim = s.nim
+          AND krs.kode_mk = s.kode_mk
+          AND krs.semester = s.semester
+    )
+"""
+
+
+class IngestError(Exception):
+    def __init__(self, errors):
+        super().__init__("; ".join(str(error) for error in errors))
+        self.errors = errors
+
+
+class NdjsonAsCsv:
+    # File-like adapter for copy_expert: turns NDJSON lines into the CSV
+    # layout of COPY_CSV while COPY reads, without materializing the file
+    def __init__(self, stream):
+        self._lines = iter(stream)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._writer.writerow(COLUMNS)
+        self.line_no = 0
+        self.error = None
+
+    def read(self, size=-1):
+        while self.error is None and (size < 0 or self._buffer.tell() < size):
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self.line_no += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                self._writer.writerow([record.get(column) for column in COLUMNS])
+            except (ValueError, AttributeError) as e:
+                # exceptions raised inside read() are reported by psycopg2 as
+                # a generic COPY failure, so keep the real cause here
+                self.error = f"baris {self.line_no}: {e}"
+
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        if self.error is not None:
+            raise ValueError(self.error)
+        return data
+
+
+def ingest(conn, stream, fmt="csv", max_errors=100):
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.execute(STAGING_DDL)
+
+    source = NdjsonAsCsv(stream) if fmt == "ndjson" else stream
+    try:
+        cursor.copy_expert(COPY_CSV, source)
+    except (psycopg2.DataError, psycopg2.ProgrammingError, ValueError) as e:
+        conn.rollback()
+        raise IngestError([getattr(source, "error", None) or str(e).strip()])
+    except psycopg2.Error:
+        if getattr(source, "error", None):
+            conn.rollback()
+            raise IngestError([source.error])
+        raise
+    rows = cursor.rowcount
+    # temp tables are never auto-analyzed; the validation joins need stats
+    cursor.execute("ANALYZE krs_staging")
+
+    cursor.execute(VALIDATE_QUERY, (max_errors,))
+    errors = [
+        {"error": row[0], "value": row[1], "rows": row[2]}
+        for row in cursor.fetchall()
+    ]
+    if errors:
+        conn.rollback()
+        raise IngestError(errors)
+
+    # blocks other writers of krs (not readers) so the update/insert pair
+    # cannot race with a concurrent ingest into duplicate rows
+    cursor.execute("LOCK TABLE krs IN SHARE ROW EXCLUSIVE MODE")
+    cursor.execute(UPDATE_QUERY)
+    updated = cursor.fetchone()[0]
+    cursor.execute(INSERT_QUERY)
+    inserted = cursor.rowcount
+    cursor.execute("SELECT DISTINCT nim FROM krs_staging")
+    nims = [row[0] for row in cursor.fetchall()]
+
+    seconds = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": rows - inserted - updated,
+        "nims": nims,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+    }
+
+
+def main():
+    # DB_CONFIG is read from main so the CLI uses the same env vars as the service
+    from main import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Muat nilai krs secara massal lewat COPY")
+    parser.add_argument("path", help="file CSV (header nim,kode_mk,nilai,semester) atau NDJSON")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None)
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        with open(args.path, "rb") as f:
+            report = ingest(conn, f, fmt)
+        conn.commit()
+    except IngestError as e:
+        for error in e.errors:
+            print(error)
+        raise SystemExit(1)
+    finally:
+        conn.close()
+
+    print(
+        f"{report['rows']} rows ({report['inserted']} inserted, {report['updated']} updated, "
+        f"{report['unchanged']} unchanged) for {len(report['nims'])} students "
+        f"in {report['seconds']}s, {report['rows_per_sec']} rows/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
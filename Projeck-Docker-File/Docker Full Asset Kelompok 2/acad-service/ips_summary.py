@@ -0,0 +1,78 @@
+import argparse
+import sys
+
+import psycopg2
+
+# Tabel, view, fungsi dan trigger ips_summary dibuat oleh
+# migrations/0001_ips_summary.sql (jalankan lewat migrate.py)
+
+CHECK_QUERY = """
+    SELECT COALESCE(s.nim, r.nim), COALESCE(s.semester, r.semester),
+           s.total_sks, r.total_sks, s.kumulatif_bobot, r.kumulatif_bobot,
+           s.ipk, r.ipk
+    FROM ips_summary s
+    FULL OUTER JOIN ips_summary_raw r
+      ON r.nim = s.nim AND r.semester = s.semester
+    WHERE s.nim IS NULL
+       OR r.nim IS NULL
+       OR s.total_sks <> r.total_sks
+       OR s.kumulatif_sks <> r.kumulatif_sks
+       OR abs(s.total_bobot - r.total_bobot) > 1e-9
+       OR abs(s.kumulatif_bobot - r.kumulatif_bobot) > 1e-9
+    ORDER BY 1, 2
+    LIMIT %s
+"""
+
+
+def rebuild(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT rebuild_ips_summary()")
+    return cursor.fetchone()[0]
+
+
+def check(conn, limit=50):
+    cursor = conn.cursor()
+    cursor.execute(CHECK_QUERY, (limit,))
+    return [
+        {
+            "nim": row[0],
+            "semester": row[1],
+            "summary_sks": row[2],
+            "raw_sks": row[3],
+            "summary_bobot": row[4],
+            "raw_bobot": row[5],
+            "summary_ipk": row[6],
+            "raw_ipk": row[7],
+        }
+        for row in cursor.fetchall()
+    ]
+
+
+def main():
+    # DB_CONFIG is read from main so the CLI uses the same env vars as the service
+    from main import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Kelola tabel ringkasan IPS/IPK")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        if args.command == "rebuild":
+            print(f"ips_summary rebuilt, {rebuild(conn)} rows")
+        else:
+            mismatches = check(conn, args.limit)
+            for mismatch in mismatches:
+                print(mismatch)
+            print(f"{len(mismatches)} mismatched (nim, semester) rows")
+            if mismatches:
+                conn.rollback()
+                sys.exit(1)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
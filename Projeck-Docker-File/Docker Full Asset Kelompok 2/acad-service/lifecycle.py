@@ -0,0 +1,100 @@
+import os
+import time
+
+
+class Lifecycle:
+    # Readiness of this worker process. Startup registers the checks it
+    # still has to pass, the readiness probe fails until all of them are
+    # done, and again as soon as a SIGTERM starts draining (see serve.py).
+    def __init__(self):
+        self.checks = {}
+        self.draining = False
+        self.draining_since = None
+        self.started_at = time.time()
+        # called once when draining starts, e.g. to end long-lived streams
+        self.on_drain = []
+        # called with this Lifecycle after every check and on draining
+        self.on_change = []
+
+    def require(self, *names):
+        for name in names:
+            self.checks.setdefault(name, False)
+
+    def done(self, name):
+        self.checks[name] = True
+        self._changed()
+
+    def start_draining(self):
+        if not self.draining:
+            self.draining = True
+            self.draining_since = time.time()
+            for callback in self.on_drain:
+                callback()
+            self._changed()
+
+    def _changed(self):
+        for callback in self.on_change:
+            callback(self)
+
+    @property
+    def ready(self):
+        return not self.draining and all(self.checks.values())
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "draining": self.draining,
+            "checks": dict(self.checks),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+        }
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class WorkerBoard:
+    # Readiness across the workers serve.py starts on one shared socket: a
+    # probe lands on a random worker, so each worker publishes its own state
+    # in a file named after its pid, in a directory serve.py empties before
+    # starting them. The whole service is ready only while `expected` live
+    # workers report ready and none is starting or draining.
+    def __init__(self, directory, expected):
+        self.directory = directory
+        self.expected = expected
+        self.path = os.path.join(directory, str(os.getpid()))
+
+    def publish(self, lifecycle):
+        if lifecycle.draining:
+            worker_state = "draining"
+        else:
+            worker_state = "ready" if lifecycle.ready else "starting"
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(worker_state)
+        os.replace(tmp, self.path)
+
+    def workers(self):
+        states = {}
+        for name in os.listdir(self.directory):
+            if not name.isdigit() or not _alive(int(name)):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    states[name] = f.read()
+            except FileNotFoundError:
+                continue
+        return states
+
+    def ready(self, states=None):
+        states = self.workers() if states is None else states
+        return len(states) >= self.expected and all(value == "ready" for value in states.values())
+
+
+state = Lifecycle()
@@ -1,14 +1,49 @@
-from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import psycopg2
+import asyncio
+import contextvars
+import functools
+import hmac
 import os
-from datetime import datetime
-from contextlib import contextmanager
-import json
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+import tempfile
+import weakref
 
-app = FastAPI(title="Product Service", version="1.0.0")
+from db_pool import ConnectionPool, PoolClosed, PoolTimeout
+import migrate
+from ingest import IngestError, ingest
+import export
+from admission import Limiter, Overloaded
+import analytics
+from events import EventHub, NotifyListener
+import lifecycle
+import metrics
+import pages
+import profiler
+from nim_index import NimIndex
+from prepared import StatementCache
+from ranking import RankingIndex
+from replicas import READ_PRIMARY_COOKIE, ReadPrimaryMiddleware, ReplicaSet, parse_hosts
+from compression import ApiGZipMiddleware
+from cache import ResponseCache
+
+# ORJSONResponse: orjson serializes the list-of-dict payloads several times
+# faster than json.dumps. Hot endpoints return it directly, which also skips
+# FastAPI's jsonable_encoder pass over data that is already plain JSON types.
+app = FastAPI(
+    title="Product Service",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +53,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    ApiGZipMiddleware,
+    minimum_size=int(os.getenv("GZIP_MIN_SIZE", "1024")),
+    compresslevel=int(os.getenv("GZIP_LEVEL", "6")),
+)
+
+app.add_middleware(ReadPrimaryMiddleware)
+
+app.add_middleware(
+    profiler.SamplingMiddleware,
+    rate=float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0")),
+)
+
+app.add_middleware(metrics.MetricsMiddleware)
+
 
 DB_CONFIG = {
     "host": os.getenv("DB_HOST", "acad-db"),
@@ -27,6 +77,164 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASSWORD", "productpass"),
 }
 
+DB_POOL_CONFIG = {
+    "minconn": int(os.getenv("DB_POOL_MIN", "2")),
+    "maxconn": int(os.getenv("DB_POOL_MAX", "10")),
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", "5")),
+    "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+    "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+    "check_interval": float(os.getenv("DB_POOL_CHECK_INTERVAL", "5")),
+}
+
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "1") == "1"
+
+IPS_BATCH_MAX = int(os.getenv("IPS_BATCH_MAX", "1000"))
+
+MAHASISWA_PAGE_DEFAULT = int(os.getenv("MAHASISWA_PAGE_DEFAULT", "100"))
+MAHASISWA_PAGE_MAX = int(os.getenv("MAHASISWA_PAGE_MAX", "1000"))
+MAHASISWA_STREAM_BATCH = int(os.getenv("MAHASISWA_STREAM_BATCH", "1000"))
+
+# Endpoint admin (bulk KRS, invalidasi cache, ekspor transkrip) ikut
+# ter-proxy publik lewat nginx /api/acad, jadi pemanggilnya wajib mengirim
+# Authorization: Bearer <ACAD_ADMIN_TOKEN>.
+# Tanpa token terkonfigurasi endpoint tersebut selalu ditolak.
+ADMIN_TOKEN = os.getenv("ACAD_ADMIN_TOKEN", "")
+
+# body upload bulk disimpan di memori sampai batas ini, selebihnya ke disk
+INGEST_SPOOL_MAX = int(os.getenv("INGEST_SPOOL_MAX", str(16 * 1024 * 1024)))
+
+# TTL dalam detik per endpoint, 0 mematikan cache untuk endpoint tersebut
+CACHE_TTL = {
+    "ips": float(os.getenv("CACHE_TTL_IPS", "60")),
+    "nilai": float(os.getenv("CACHE_TTL_NILAI", "60")),
+    "mahasiswa": float(os.getenv("CACHE_TTL_MAHASISWA", "30")),
+    "dashboard": float(os.getenv("CACHE_TTL_DASHBOARD", "60")),
+    "cohort": float(os.getenv("CACHE_TTL_COHORT", "600")),
+}
+
+response_cache = ResponseCache(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")))
+
+# daftar NIM di memori untuk HEAD /api/acad/mahasiswa/{nim}; refresh membaca
+# krs_version yang berubah, full reload membuang mahasiswa yang sudah dihapus
+NIM_INDEX_REFRESH = float(os.getenv("NIM_INDEX_REFRESH", "5"))
+NIM_INDEX_FULL_RELOAD = float(os.getenv("NIM_INDEX_FULL_RELOAD", "3600"))
+
+nim_index = NimIndex(
+    bloom=os.getenv("NIM_INDEX_BLOOM", "0") == "1",
+    error_rate=float(os.getenv("NIM_INDEX_BLOOM_ERROR_RATE", "0.001")),
+)
+
+# peringkat IPS per (jurusan, angkatan) di memori, diperbarui dengan cara
+# yang sama seperti nim_index
+RANKING_REFRESH = float(os.getenv("RANKING_REFRESH", "5"))
+RANKING_FULL_RELOAD = float(os.getenv("RANKING_FULL_RELOAD", "3600"))
+RANKING_TOP_MAX = int(os.getenv("RANKING_TOP_MAX", "1000"))
+
+ranking = RankingIndex()
+
+# Server-sent events per NIM, diumpankan dari satu koneksi LISTEN per worker
+SSE_MAX_CONNECTIONS = int(os.getenv("SSE_MAX_CONNECTIONS", "1000"))
+SSE_MAX_PER_NIM = int(os.getenv("SSE_MAX_PER_NIM", "5"))
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+event_hub = EventHub(max_connections=SSE_MAX_CONNECTIONS, max_per_nim=SSE_MAX_PER_NIM)
+lifecycle.state.on_drain.append(event_hub.close)
+
+# diisi serve.py bila ada beberapa worker: /health/ready baru lolos kalau
+# semua worker siap, bukan hanya worker yang kebetulan menerima probe
+worker_board = (
+    lifecycle.WorkerBoard(os.environ["ACAD_WORKER_BOARD"], int(os.getenv("ACAD_WORKERS", "1")))
+    if os.getenv("ACAD_WORKER_BOARD")
+    else None
+)
+if worker_board is not None:
+    lifecycle.state.on_change.append(worker_board.publish)
+
+db_pool = ConnectionPool(
+    DB_CONFIG,
+    on_connect=lambda seconds: metrics.DB_CONNECT_SECONDS.observe(value=seconds),
+    on_acquire=lambda seconds: metrics.DB_POOL_WAIT_SECONDS.observe(value=seconds),
+    **DB_POOL_CONFIG,
+)
+
+# Read replica opsional: GET yang hanya membaca memakai replica yang sehat,
+# tulis (bulk ingest) dan fallback tetap ke primary
+DB_REPLICA_HOSTS = parse_hosts(os.getenv("DB_REPLICA_HOSTS", ""), DB_CONFIG["port"])
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+DB_REPLICA_CONNECT_TIMEOUT = int(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", "2"))
+# setelah menulis, baca NIM tersebut (dan semua bacaan klien penulis, lewat
+# cookie) dari primary selama sekian detik; 0 mematikan
+DB_READ_STICKY_SECONDS = float(os.getenv("DB_READ_STICKY_SECONDS", "5"))
+
+replicas = ReplicaSet.from_hosts(
+    db_pool,
+    DB_CONFIG,
+    DB_REPLICA_HOSTS,
+    DB_POOL_CONFIG,
+    connect_timeout=DB_REPLICA_CONNECT_TIMEOUT,
+    max_lag=DB_REPLICA_MAX_LAG,
+    sticky_seconds=DB_READ_STICKY_SECONDS,
+    on_route=lambda target, reason: metrics.DB_READS.inc(target, reason),
+)
+
+# Admission control per kelas endpoint: (limit, antrean, detik tunggu).
+# Hanya kerja yang menyentuh database dihitung; cache hit, /health dan
+# /metrics tidak pernah antre. Kelebihan beban dijawab 503 + Retry-After.
+ADMISSION_DEFAULTS = {
+    "read": (DB_POOL_CONFIG["maxconn"], DB_POOL_CONFIG["maxconn"] * 4, 0.5),
+    "list": (max(1, DB_POOL_CONFIG["maxconn"] // 2), DB_POOL_CONFIG["maxconn"], 0.5),
+    "export": (2, 2, 1.0),
+    "write": (1, 4, 5.0),
+}
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+
+def admission_limiter(name, limit, queue_size, max_wait):
+    prefix = f"ADMISSION_{name.upper()}"
+    return Limiter(
+        name,
+        limit=int(os.getenv(f"{prefix}_LIMIT", str(limit))),
+        queue_size=int(os.getenv(f"{prefix}_QUEUE", str(queue_size))),
+        max_wait=float(os.getenv(f"{prefix}_WAIT", str(max_wait))),
+        retry_after=ADMISSION_RETRY_AFTER,
+    )
+
+
+limiters = {name: admission_limiter(name, *config) for name, config in ADMISSION_DEFAULTS.items()}
+
+# psycopg2 is blocking, so every query runs on this executor instead of the
+# event loop. One worker per pooled connection keeps threads from queueing
+# on the pool; extra requests wait here without holding a connection.
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", DB_POOL_CONFIG["maxconn"]))
+
+db_executor = ThreadPoolExecutor(
+    max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="acad-db"
+)
+
+# Slow query log: query di atas SLOW_QUERY_MS (dari request yang tersampel)
+# masuk ring buffer, opsional dengan EXPLAIN (ANALYZE, BUFFERS) di thread
+# terpisah. Isi buffer hanya bisa dibaca lewat /debug/slow-queries bila
+# SLOW_QUERY_DEBUG=1, karena memuat parameter (NIM) apa adanya.
+SLOW_QUERY_DEBUG = os.getenv("SLOW_QUERY_DEBUG", "0") == "1"
+
+slow_queries = profiler.SlowQueryLog(
+    threshold=float(os.getenv("SLOW_QUERY_MS", "200")) / 1000,
+    size=int(os.getenv("SLOW_QUERY_BUFFER", "200")),
+    explain=os.getenv("SLOW_QUERY_EXPLAIN", "0") == "1",
+    explain_timeout=float(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT", "5")),
+    get_connection=lambda: get_db_connection(),
+    log=lambda line: print("Acad Service:", line),
+)
+metrics.QUERY_HOOKS.append(slow_queries.observe)
+
+# Query panas (versi, IPS, nilai, dashboard, cek NIM) di-PREPARE sekali per
+# koneksi pool lalu dijalankan dengan EXECUTE, jadi Postgres tidak mem-parse
+# dan merencanakan ulang join-nya di setiap request. DB_PREPARE=0 bila ada
+# pooler mode transaksi di antara service dan Postgres.
+statements = StatementCache(enabled=os.getenv("DB_PREPARE", "1") == "1")
+
 
 class Mahasiswa(BaseModel):
     nim: str
@@ -34,26 +242,299 @@ class Mahasiswa(BaseModel):
     jurusan: str
     angkatan: int = Field(ge=0)
 
+
+class IpsBatchRequest(BaseModel):
+    nims: List[str] = Field(min_length=1, max_length=IPS_BATCH_MAX)
+
+
+class CacheInvalidateRequest(BaseModel):
+    nim: Optional[str] = None
+    kode_mk: Optional[str] = None
+
+
 @contextmanager
-def get_db_connection():
-    conn = psycopg2.connect(**DB_CONFIG)
+def get_db_connection(pool=None):
+    # pool: replicas.for_read(...) for read-only work, default the primary
+    pool = pool or db_pool
+    try:
+        conn = pool.getconn()
+    except (PoolTimeout, PoolClosed) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    broken = False
     try:
         yield conn
         conn.commit()
-    except Exception:
-        conn.rollback()
+    except Exception as e:
+        broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        if not broken:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            # koneksi replica putus: keluarkan dari rotasi sampai check() berikutnya
+            replicas.failed(pool, e)
         raise
     finally:
-        conn.close()
+        pool.putconn(conn, broken=broken)
+
+
+def replica_read(nims=lambda *args: ()):
+    # Fetcher read-only menerima pool sebagai argumen pertama, dipilih oleh
+    # replicas.for_read(*nims(*args)). Gagal koneksi di replica diulang
+    # sekali di primary (lihat ReplicaSet.read); pemanggil tidak berubah.
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            return replicas.read(fn, *args, nims=nims(*args))
+        return wrapper
+    return decorate
+
+
+async def admit(kind):
+    try:
+        return await limiters[kind].acquire()
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server sedang sibuk ({e}), coba lagi",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+@asynccontextmanager
+async def admitted(kind):
+    slot = await admit(kind)
+    try:
+        yield slot
+    finally:
+        slot.release()
+
+
+async def run_db(fn, *args, admission=None):
+    loop = asyncio.get_running_loop()
+    # carry context variables (replicas.read_primary) into the worker thread
+    call = functools.partial(contextvars.copy_context().run, fn, *args)
+    if admission is None:
+        return await loop.run_in_executor(db_executor, call)
+
+    slot = await admit(admission)
+    try:
+        future = db_executor.submit(call)
+    except BaseException:
+        slot.release()
+        raise
+    # the slot is held until the thread is done, even when the request is
+    # cancelled, so the limit matches the work actually running in Postgres
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(slot.release))
+    return await asyncio.wrap_future(future)
+
+
+async def release_after(slot, chunks):
+    # streaming responses keep their slot until the body is finished
+    try:
+        if hasattr(chunks, "__aiter__"):
+            async for chunk in chunks:
+                yield chunk
+        else:
+            async for chunk in iterate_on_executor(chunks):
+                yield chunk
+    finally:
+        slot.release()
+
+
+async def iterate_on_executor(chunks):
+    # Sync generators (server-side cursors) advance one chunk at a time on
+    # db_executor. They are closed explicitly when the stream ends, also on
+    # client disconnect, so the `with get_db_connection()` inside returns
+    # its pooled connection now instead of whenever the generator is GC'd.
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    pending = None
+    try:
+        while True:
+            pending = loop.run_in_executor(db_executor, context.run, next, chunks, None)
+            chunk = await asyncio.shield(pending)
+            pending = None
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        if pending is not None:
+            # cancelled while a chunk was being read: a running generator
+            # cannot be closed, wait for that read to finish first
+            await asyncio.wait([pending])
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            await loop.run_in_executor(db_executor, context.run, close)
+
+
+def guarded_stream(slot, chunks):
+    stream = release_after(slot, chunks)
+    # an async generator that never starts never runs its finally block,
+    # e.g. when the client disconnects before the first chunk
+    weakref.finalize(stream, slot.release)
+    return stream
+
+
+# task latar belakang, disimpan supaya tidak di-garbage-collect dan bisa
+# dibatalkan saat shutdown
+background_tasks = set()
+
+
+def start_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
 
 
 @app.on_event("startup")
 async def startup_event():
+    # server sudah menerima request (dan /health menjawab) selama warm-up;
+    # /health/ready baru 200 setelah semua tahap di bawah selesai
+    lifecycle.state.require("database", "migrations", "nim_index")
+    if worker_board is not None:
+        worker_board.publish(lifecycle.state)
+    start_background(warm_up())
+    if replicas.replicas:
+        start_background(monitor_replicas())
+
+
+async def monitor_replicas():
+    while True:
+        try:
+            healthy = await run_db(replicas.check)
+            if healthy < len(replicas.replicas):
+                print(f"Acad Service: {healthy}/{len(replicas.replicas)} read replicas healthy")
+        except Exception as e:
+            print("Replica check error:", e)
+        await asyncio.sleep(DB_REPLICA_CHECK_INTERVAL)
+
+
+async def warm_up():
+    delay = 1.0
+    while True:
+        try:
+            opened = await run_db(db_pool.prewarm)
+            print(f"Acad Service: Connected to PostgreSQL ({opened} pooled connections)")
+            break
+        except Exception as e:
+            print("PostgreSQL connection error:", e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+    lifecycle.state.done("database")
+
+    # migrasi gagal (mis. DB masih recovery) dicoba lagi seperti prewarm,
+    # selama itu /health/ready tetap 503 dan index belum dimuat
+    delay = 1.0
+    while DB_MIGRATE_ON_STARTUP:
+        try:
+            await run_db(run_migrations)
+            break
+        except Exception as e:
+            print("Migration error:", e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+    lifecycle.state.done("migrations")
+
+    start_background(maintain_index(
+        "nim_index",
+        nim_index,
+        NIM_INDEX_REFRESH,
+        NIM_INDEX_FULL_RELOAD,
+        # krs berubah (juga lewat proses lain), statistik angkatan basi
+        on_change=lambda: response_cache.invalidate("cohort"),
+    ))
+    start_background(maintain_index("ranking", ranking, RANKING_REFRESH, RANKING_FULL_RELOAD))
+    start_background(krs_listener.run())
+
+
+def on_krs_changes(changes):
+    # dipanggil di event loop untuk setiap NOTIFY krs_version: cache semua
+    # worker ikut batal, bukan hanya worker yang menerima bulk ingest
+    nims = [nim for nim, _ in changes]
+    replicas.wrote(*nims)
+    for nim, version in changes:
+        invalidate_nim(nim)
+        event_hub.publish(nim, version)
+    for wakeup in index_wakeups.values():
+        wakeup.set()
+
+
+def on_krs_reconnect():
+    # notifikasi selama koneksi putus hilang, anggap semua cache basi
+    response_cache.clear()
+    for wakeup in index_wakeups.values():
+        wakeup.set()
+
+
+krs_listener = NotifyListener(
+    DB_CONFIG,
+    on_changes=on_krs_changes,
+    on_reconnect=on_krs_reconnect,
+    log=lambda line: print("Acad Service:", line),
+)
+
+
+def load_index(index, full):
+    with get_db_connection() as conn:
+        return index.load(conn) if full else index.refresh(conn)
+
+
+# dibangunkan oleh notifikasi krs_version supaya refresh tidak menunggu interval
+index_wakeups = {}
+
+
+async def maintain_index(name, index, interval, full_reload, on_change=None):
+    # load() sekali lalu setiap full_reload detik, di antaranya refresh()
+    # inkremental dari krs_version setiap interval detik
+    wakeup = index_wakeups[name] = asyncio.Event()
+    last_load = None
+    while True:
+        full = last_load is None or time.monotonic() - last_load >= full_reload
+        try:
+            watermark = index.watermark
+            count = await run_db(load_index, index, full)
+            if on_change is not None and index.watermark != watermark:
+                on_change()
+            if full:
+                last_load = time.monotonic()
+                lifecycle.state.done(name)
+                print(f"Acad Service: {name} loaded ({count} students)")
+        except Exception as e:
+            print(f"{name} refresh error:", e)
+        try:
+            await asyncio.wait_for(wakeup.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+
+
+def run_migrations():
+    # koneksi terpisah dari pool: migrasi no-transaction butuh autocommit
+    conn = psycopg2.connect(**DB_CONFIG)
     try:
-        with get_db_connection():
-            print("Acad Service: Connected to PostgreSQL")
-    except Exception as e:
-        print("PostgreSQL connection error:", e)
+        done = migrate.migrate(conn, log=lambda line: print("Acad Service:", line))
+        print(f"Acad Service: schema up to date ({len(done)} migrations applied)")
+    finally:
+        conn.close()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    krs_listener.close()
+    event_hub.close()
+    for task in list(background_tasks):
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    db_executor.shutdown(wait=True)
+    slow_queries.close()
+    replicas.close()
+    remaining = db_pool.close()
+    if remaining:
+        print(f"Acad Service: {remaining} connections still in use at shutdown")
 
 
 @app.get("/")
@@ -62,456 +543,142 @@ async def read_root(request: Request):
     
     if session_data:
         # User is logged in
-        html_content = """
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Dashboard Mahasiswa</title>
-            <style>
-                :root {
-                    --primary-dark: #005461;
-                    --primary: #018790;
-                    --accent: #00B7B5;
-                    --light-bg: #F4F4F4;
-                }
-                
-                body {
-                    font-family: Arial, sans-serif;
-                    margin: 0;
-                    padding: 0;
-                    background-color: var(--light-bg);
-                    color: #333;
-                }
-                
-                .header {
-                    background-color: var(--primary-dark);
-                    color: white;
-                    padding: 15px 20px;
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                }
-                
-                .container {
-                    max-width: 1200px;
-                    margin: 20px auto;
-                    padding: 20px;
-                }
-                
-                .dashboard-card {
-                    background-color: white;
-                    padding: 25px;
-                    border-radius: 8px;
-                    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                    margin-bottom: 20px;
-                }
-                
-                h1, h2 {
-                    color: var(--primary-dark);
-                    margin-top: 0;
-                }
-                
-                .info-grid {
-                    display: grid;
-                    grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                    gap: 15px;
-                    margin: 20px 0;
-                }
-                
-                .info-item {
-                    background-color: var(--light-bg);
-                    padding: 15px;
-                    border-radius: 5px;
-                    text-align: center;
-                }
-                
-                .info-label {
-                    font-weight: bold;
-                    color: var(--primary);
-                    margin-bottom: 5px;
-                }
-                
-                .info-value {
-                    font-size: 1.2em;
-                    color: var(--primary-dark);
-                }
-                
-                table {
-                    width: 100%;
-                    border-collapse: collapse;
-                    margin-top: 20px;
-                }
-                
-                th, td {
-                    padding: 12px;
-                    text-align: left;
-                    border-bottom: 1px solid #ddd;
-                }
-                
-                th {
-                    background-color: var(--primary);
-                    color: white;
-                }
-                
-                tr:hover {
-                    background-color: var(--light-bg);
-                }
-                
-                .logout-btn {
-                    background-color: var(--primary);
-                    color: white;
-                    border: none;
-                    padding: 10px 20px;
-                    border-radius: 5px;
-                    cursor: pointer;
-                    font-size: 14px;
-                }
-                
-                .logout-btn:hover {
-                    background-color: var(--accent);
-                }
-                
-                @media (max-width: 768px) {
-                    .info-grid {
-                        grid-template-columns: 1fr;
-                    }
-                    
-                    .header {
-                        flex-direction: column;
-                        text-align: center;
-                    }
-                    
-                    .container {
-                        padding: 15px;
-                    }
-                    
-                    table {
-                        font-size: 14px;
-                    }
-                    
-                    th, td {
-                        padding: 8px;
-                    }
-                }
-                
-                @media (max-width: 480px) {
-                    table {
-                        font-size: 12px;
-                    }
-                    
-                    th, td {
-                        padding: 6px;
-                    }
-                    
-                    .dashboard-card {
-                        padding: 15px;
-                    }
-                }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>Dashboard Mahasiswa</h1>
-                <button class="logout-btn" onclick="logout()">Logout</button>
-            </div>
-            
-            <div class="container">
-                <div class="dashboard-card">
-                    <h2>Informasi Mahasiswa</h2>
-                    <div class="info-grid">
-                        <div class="info-item">
-                            <div class="info-label">NIM</div>
-                            <div class="info-value" id="nim-display">-</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-label">Nama</div>
-                            <div class="info-value" id="nama-display">-</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-label">Jurusan</div>
-                            <div class="info-value" id="jurusan-display">-</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-label">IPS</div>
-                            <div class="info-value" id="ips-display">-</div>
-                        </div>
-                    </div>
-                </div>
-                
-                <div class="dashboard-card">
-                    <h2>Nilai Mata Kuliah</h2>
-                    <table id="nilai-table">
-                        <thead>
-                            <tr>
-                                <th>Kode MK</th>
-                                <th>Nama Mata Kuliah</th>
-                                <th>SKS</th>
-                                <th>Nilai</th>
-                                <th>Semester</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            <!-- Nilai akan dimuat di sini -->
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-
-            <script>
-                let nim = null;
-                
-                async function loadDashboard() {
-                    try {
-                        const urlParams = new URLSearchParams(window.location.search);
-                        nim = urlParams.get('nim');
-                        
-                        if (!nim) {
-                            window.location.href = '/login';
-                            return;
-                        }
-                        
-                        // Get student info and IPS
-                        const ipsResponse = await fetch(`/api/acad/ips?nim=${nim}`);
-                        const ipsData = await ipsResponse.json();
-                        
-                        document.getElementById('nim-display').textContent = ipsData.nim;
-                        document.getElementById('nama-display').textContent = ipsData.nama;
-                        document.getElementById('jurusan-display').textContent = ipsData.jurusan;
-                        document.getElementById('ips-display').textContent = ipsData.ips;
-                        
-                        // Get all grades for this student
-                        const nilaiResponse = await fetch(`/api/acad/nilai-matkul?nim=${nim}`);
-                        const nilaiData = await nilaiResponse.json();
-                        
-                        const tbody = document.querySelector('#nilai-table tbody');
-                        tbody.innerHTML = '';
-                        
-                        nilaiData.forEach(nilai => {
-                            const row = document.createElement('tr');
-                            row.innerHTML = `
-                                <td>${nilai.kode_mk}</td>
-                                <td>${nilai.nama_mk}</td>
-                                <td>${nilai.sks}</td>
-                                <td>${nilai.nilai}</td>
-                                <td>${nilai.semester}</td>
-                            `;
-                            tbody.appendChild(row);
-                        });
-                        
-                    } catch (error) {
-                        console.error('Error loading dashboard:', error);
-                        alert('Terjadi kesalahan saat memuat data');
-                    }
-                }
-                
-                function logout() {
-                    document.cookie = "session=; expires=Thu, 01 Jan 1970 00:00:00 UTC; path=/;";
-                    window.location.href = '/login';
-                }
-                
-                document.addEventListener('DOMContentLoaded', loadDashboard);
-            </script>
-        </body>
-        </html>
-        """
-        return HTMLResponse(content=html_content)
+        return pages.DASHBOARD_PAGE.response(request)
     else:
         # Redirect to login page
         return RedirectResponse(url="/login")
 
 
 @app.get("/login")
-async def login_page():
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Login Mahasiswa</title>
-        <style>
-            :root {
-                --primary-dark: #005461;
-                --primary: #018790;
-                --accent: #00B7B5;
-                --light-bg: #F4F4F4;
-            }
-            
-            body {
-                font-family: Arial, sans-serif;
-                margin: 0;
-                padding: 0;
-                background: linear-gradient(135deg, var(--primary), var(--accent));
-                height: 100vh;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-            }
-            
-            .login-container {
-                background-color: white;
-                padding: 40px;
-                border-radius: 10px;
-                box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-                width: 100%;
-                max-width: 400px;
-                text-align: center;
-            }
-            
-            h1 {
-                color: var(--primary-dark);
-                margin-bottom: 30px;
-            }
-            
-            .form-group {
-                margin-bottom: 20px;
-                text-align: left;
-            }
-            
-            label {
-                display: block;
-                margin-bottom: 8px;
-                color: var(--primary-dark);
-                font-weight: bold;
-            }
-            
-            input[type="text"], input[type="password"] {
-                width: 100%;
-                padding: 12px;
-                border: 2px solid #ddd;
-                border-radius: 5px;
-                font-size: 16px;
-                box-sizing: border-box;
-            }
-            
-            input[type="text"]:focus, input[type="password"]:focus {
-                border-color: var(--primary);
-                outline: none;
-            }
-            
-            .login-btn {
-                background-color: var(--primary);
-                color: white;
-                border: none;
-                padding: 15px 20px;
-                border-radius: 5px;
-                cursor: pointer;
-                font-size: 16px;
-                width: 100%;
-                margin-top: 10px;
-            }
-            
-            .login-btn:hover {
-                background-color: var(--accent);
-            }
-            
-            .error-message {
-                color: red;
-                margin-top: 10px;
-                display: none;
-            }
-            
-            @media (max-width: 480px) {
-                .login-container {
-                    margin: 20px;
-                    padding: 30px 20px;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="login-container">
-            <h1>Login Mahasiswa</h1>
-            <form id="loginForm">
-                <div class="form-group">
-                    <label for="nim">NIM:</label>
-                    <input type="text" id="nim" name="nim" required>
-                </div>
-                <div class="form-group">
-                    <label for="password">Password:</label>
-                    <input type="password" id="password" name="password" required>
-                </div>
-                <button type="submit" class="login-btn">Login</button>
-            </form>
-            <div id="errorMessage" class="error-message"></div>
-        </div>
-
-        <script>
-            document.getElementById('loginForm').addEventListener('submit', async function(e) {
-                e.preventDefault();
-                
-                const formData = new FormData(this);
-                const nim = formData.get('nim');
-                const password = formData.get('password');
-                
-                // Check if NIM equals password
-                if (nim !== password) {
-                    document.getElementById('errorMessage').textContent = 'NIM dan Password harus sama!';
-                    document.getElementById('errorMessage').style.display = 'block';
-                    return;
-                }
-                
-                try {
-                    // Verify that the student exists in database
-                    const response = await fetch(`/api/acad/ips?nim=${nim}`);
-                    if (response.ok) {
-                        // Create a simple session cookie
-                        document.cookie = `session=${nim}; path=/;`;
-                        window.location.href = `/?nim=${nim}`;
-                    } else {
-                        document.getElementById('errorMessage').textContent = 'NIM tidak ditemukan!';
-                        document.getElementById('errorMessage').style.display = 'block';
-                    }
-                } catch (error) {
-                    document.getElementById('errorMessage').textContent = 'Terjadi kesalahan!';
-                    document.getElementById('errorMessage').style.display = 'block';
-                }
-            });
-        </script>
-    </body>
-    </html>
-    """
-    return HTMLResponse(content=html_content)
+async def login_page(request: Request):
+    return pages.LOGIN_PAGE.response(request)
 
 
-# New endpoint to get all course grades for a student
-@app.get("/api/acad/nilai-matkul")
-async def get_nilai_matkul(nim: str = Query(..., description="NIM Mahasiswa")):
+# Versi per mahasiswa dari krs_version (migrations/0003_krs_version.sql),
+# dipakai sebagai ETag/Last-Modified untuk endpoint per mahasiswa
+VERSION_QUERY = "SELECT version, updated_at FROM krs_version WHERE nim = %s"
+
+
+class Versioned:
+    __slots__ = ("version", "updated_at", "body")
+
+    def __init__(self, version, updated_at, body):
+        self.version = version
+        self.updated_at = updated_at
+        self.body = body
+
+
+def read_version(cursor, nim):
+    # dibaca sebelum data: kalau krs berubah di antaranya, versi yang
+    # tersimpan lebih lama dari datanya dan klien hanya memvalidasi ulang
+    statements.execute(cursor, "krs_version", VERSION_QUERY, (nim,))
+    return cursor.fetchone() or (0, None)
+
+
+@replica_read(lambda nim: (nim,))
+def fetch_version(pool, nim):
+    with get_db_connection(pool) as conn:
+        return read_version(conn.cursor(), nim)
+
+
+def validator_headers(nim, version, updated_at):
+    headers = {
+        # weak: the same version may go out gzip-compressed or not
+        "ETag": f'W/"{nim}.{version}"',
+        "Cache-Control": "private, no-cache",
+    }
+    if updated_at is not None:
+        headers["Last-Modified"] = format_datetime(updated_at.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def not_modified(request, nim, version, updated_at):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return pages.etag_matches(if_none_match, f'"{nim}.{version}"')
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or updated_at is None:
+        return False
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return updated_at.replace(microsecond=0) <= since
 
-            query = """
-                SELECT m.nama, mk.kode_mk, mk.nama_mk, mk.sks, krs.nilai, krs.semester
-                FROM mahasiswa m
-                JOIN krs ON krs.nim = m.nim
-                JOIN mata_kuliah mk ON mk.kode_mk = krs.kode_mk
-                WHERE m.nim = %s
-                ORDER BY krs.semester, mk.kode_mk
-            """
 
-            cursor.execute(query, (nim,))
-            rows = cursor.fetchall()
+async def versioned_response(request, nim, key, loader, ttl, tags=(), tags_of=None):
+    current = None
+    if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+        # primary key lookup only, the join runs only when the data changed
+        version, updated_at = await run_db(fetch_version, nim, admission="read")
+        if not_modified(request, nim, version, updated_at):
+            return Response(status_code=304, headers=validator_headers(nim, version, updated_at))
+        current = version
 
-            if not rows:
-                raise HTTPException(
-                    status_code=404,
-                    detail="Data mahasiswa tidak ditemukan"
-                )
+    entry = await response_cache.get_or_load(key, loader, ttl, tags=tags, tags_of=tags_of)
+    if current is not None and entry.version < current:
+        # cached copy is older than the database, reload it
+        response_cache.discard(key)
+        entry = await response_cache.get_or_load(key, loader, ttl, tags=tags, tags_of=tags_of)
+    return ORJSONResponse(entry.body, headers=validator_headers(nim, entry.version, entry.updated_at))
 
-            return [
-                {
-                    "nim": row[0],  # This is actually the name, but we'll use the nim parameter
-                    "kode_mk": row[1],
-                    "nama_mk": row[2],
-                    "sks": row[3],
-                    "nilai": row[4],
-                    "semester": row[5],
-                }
-                for row in rows
-            ]
+
+NILAI_MATKUL_QUERY = """
+    SELECT m.nama, mk.kode_mk, mk.nama_mk, mk.sks, krs.nilai, krs.semester
+    FROM mahasiswa m
+    JOIN krs ON krs.nim = m.nim
+    JOIN mata_kuliah mk ON mk.kode_mk = krs.kode_mk
+    WHERE m.nim = %s
+    ORDER BY krs.semester, mk.kode_mk
+"""
+
+
+@replica_read(lambda nim: (nim,))
+def fetch_nilai_matkul(pool, nim):
+    with get_db_connection(pool) as conn:
+        cursor = conn.cursor()
+        version, updated_at = read_version(cursor, nim)
+        statements.execute(cursor, "nilai_matkul", NILAI_MATKUL_QUERY, (nim,))
+        rows = cursor.fetchall()
+
+        if not rows:
+            raise HTTPException(
+                status_code=404,
+                detail="Data mahasiswa tidak ditemukan"
+            )
+
+        return Versioned(version, updated_at, [
+            {
+                "nim": row[0],  # This is actually the name, but we'll use the nim parameter
+                "kode_mk": row[1],
+                "nama_mk": row[2],
+                "sks": row[3],
+                "nilai": row[4],
+                "semester": row[5],
+            }
+            for row in rows
+        ])
+
+
+# New endpoint to get all course grades for a student
+@app.get("/api/acad/nilai-matkul")
+async def get_nilai_matkul(
+    request: Request,
+    nim: str = Query(..., description="NIM Mahasiswa"),
+):
+    try:
+        return await versioned_response(
+            request,
+            nim,
+            ("nilai", nim),
+            lambda: run_db(fetch_nilai_matkul, nim, admission="read"),
+            CACHE_TTL["nilai"],
+            tags=[f"nim:{nim}"],
+            tags_of=lambda entry: [f"mk:{row['kode_mk']}" for row in entry.body],
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -526,96 +693,697 @@ async def health_check():
     }
 
 
+@app.get("/health/ready")
+async def readiness():
+    # readiness probe: 503 sampai pool, migrasi dan indeks NIM siap, dan
+    # lagi begitu worker mulai drain karena SIGTERM
+    status = lifecycle.state.status()
+    if worker_board is not None:
+        status["workers"] = worker_board.workers()
+        status["ready"] = status["ready"] and worker_board.ready(status["workers"])
+    return ORJSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/health/pool")
+async def pool_stats():
+    return db_pool.stats()
+
+
+@app.get("/health/statements")
+async def statement_stats():
+    return statements.stats()
+
+
+@app.get("/health/cache")
+async def cache_stats():
+    return response_cache.stats()
+
+
+@app.get("/health/admission")
+async def admission_stats():
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+def require_debug():
+    if not SLOW_QUERY_DEBUG:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@app.get("/debug/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    query: Optional[str] = Query(None, description="nama query, mis. dashboard"),
+):
+    require_debug()
+    return ORJSONResponse({
+        "stats": slow_queries.stats(),
+        "entries": slow_queries.entries(limit, query),
+    })
+
+
+@app.delete("/debug/slow-queries")
+async def clear_slow_queries():
+    require_debug()
+    return {"removed": slow_queries.clear()}
+
+
+@app.get("/health/replicas")
+async def replica_stats():
+    return replicas.stats()
+
+
+@app.get("/health/nim-index")
+async def nim_index_stats():
+    return nim_index.stats()
+
+
+@app.get("/health/events")
+async def event_stats():
+    return {"listener": krs_listener.stats(), "hub": event_hub.stats()}
+
+
+@app.get("/health/ranking")
+async def ranking_stats():
+    return ranking.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    pool = db_pool.stats()
+    cache = response_cache.stats()
+    extra = metrics.render_values(
+        "acad_db_pool_connections",
+        "Pooled PostgreSQL connections by state",
+        "gauge",
+        [("in_use", pool["in_use"]), ("idle", pool["idle"]), ("waiting", pool["waiting"])],
+    ) + metrics.render_values(
+        "acad_cache_events_total",
+        "Response cache lookups and removals by kind",
+        "counter",
+        [(name, cache[name]) for name in ("hits", "misses", "coalesced", "evictions", "expirations", "invalidations")],
+    ) + metrics.render_values(
+        "acad_admission_in_flight",
+        "Requests holding an admission slot, by endpoint class",
+        "gauge",
+        [(name, limiter.stats()["in_flight"]) for name, limiter in limiters.items()],
+    ) + metrics.render_values(
+        "acad_admission_queue_depth",
+        "Requests waiting for an admission slot, by endpoint class",
+        "gauge",
+        [(name, limiter.stats()["queue_depth"]) for name, limiter in limiters.items()],
+    ) + metrics.render_values(
+        "acad_admission_shed_total",
+        "Requests rejected with 503 (queue full or wait timed out), by endpoint class",
+        "counter",
+        [(name, limiter.shed_queue_full + limiter.shed_timeout) for name, limiter in limiters.items()],
+    ) + metrics.render_values(
+        "acad_sse_connections",
+        "Open server-sent event streams",
+        "gauge",
+        [("open", event_hub.stats()["connections"])],
+    ) + metrics.render_values(
+        "acad_db_replica_healthy",
+        "1 when the read replica is reachable and within DB_REPLICA_MAX_LAG",
+        "gauge",
+        [(replica.name, int(replica.healthy)) for replica in replicas.replicas],
+    )
+    return PlainTextResponse(
+        metrics.render(extra),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+def mahasiswa_from_row(row):
+    return {
+        "nim": row[0],
+        "nama": row[1],
+        "jurusan": row[2],
+        "angkatan": row[3],
+    }
+
+
+def mahasiswa_query(after, jurusan, angkatan, limit):
+    # keyset pagination: halaman berikutnya dimulai setelah nim terakhir,
+    # sehingga Postgres cukup menelusuri primary key tanpa OFFSET
+    clauses = []
+    params = []
+    if after is not None:
+        clauses.append("nim > %s")
+        params.append(after)
+    if jurusan is not None:
+        clauses.append("jurusan = %s")
+        params.append(jurusan)
+    if angkatan is not None:
+        clauses.append("angkatan = %s")
+        params.append(angkatan)
+
+    query = "SELECT nim, nama, jurusan, angkatan FROM mahasiswa"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY nim"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
+
+
+@replica_read()
+def fetch_mahasiswa(pool, after, jurusan, angkatan, limit):
+    # ambil satu baris lebih untuk mengetahui apakah masih ada halaman berikutnya
+    query, params = mahasiswa_query(after, jurusan, angkatan, limit + 1)
+    with get_db_connection(pool) as conn:
+        cursor = conn.cursor()
+        metrics.execute(cursor, "mahasiswa_page", query, params)
+        rows = cursor.fetchall()
+
+    items = [mahasiswa_from_row(row) for row in rows[:limit]]
+    next_after = items[-1]["nim"] if len(rows) > limit else None
+    return {"items": items, "next_after": next_after}
+
+
+def stream_mahasiswa(pool, after, jurusan, angkatan, limit, array=False):
+    # array=True: satu JSON array (daftar lengkap tanpa paginasi), selain
+    # itu NDJSON satu baris per mahasiswa
+    query, params = mahasiswa_query(after, jurusan, angkatan, limit)
+    with get_db_connection(pool) as conn:
+        # named cursor = server-side cursor, baris diambil per batch
+        cursor = conn.cursor(name="mahasiswa_stream")
+        metrics.execute(cursor, "mahasiswa_stream", query, params)
+        if array:
+            yield b"["
+        separator = b""
+        while True:
+            rows = cursor.fetchmany(MAHASISWA_STREAM_BATCH)
+            if not rows:
+                break
+            if array:
+                yield separator + b",".join(orjson.dumps(mahasiswa_from_row(row)) for row in rows)
+                separator = b","
+            else:
+                yield b"".join(
+                    orjson.dumps(mahasiswa_from_row(row)) + b"\n" for row in rows
+                )
+        if array:
+            yield b"]"
+        cursor.close()
+
+
 @app.get("/api/acad/mahasiswa")
-async def get_mahasiswa():
+async def get_mahasiswa(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAHASISWA_PAGE_MAX),
+    after: Optional[str] = Query(None, description="NIM terakhir dari halaman sebelumnya"),
+    jurusan: Optional[str] = Query(None),
+    angkatan: Optional[int] = Query(None),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    if format == "ndjson":
+        slot = await admit("export")
+        return StreamingResponse(
+            # stream_mahasiswa is a sync generator; release_after steps it on
+            # db_executor and closes it (returning the connection) at the end
+            guarded_stream(slot, stream_mahasiswa(replicas.for_read(), after, jurusan, angkatan, limit)),
+            media_type="application/x-ndjson",
+        )
+
+    if limit is None and after is None:
+        # tanpa parameter paginasi: daftar lengkap seperti sebelum ada
+        # paginasi, dialirkan dari server-side cursor supaya memori tetap datar
+        slot = await admit("export")
+        return StreamingResponse(
+            guarded_stream(slot, stream_mahasiswa(replicas.for_read(), None, jurusan, angkatan, None, array=True)),
+            media_type="application/json",
+        )
+
+    limit = limit or MAHASISWA_PAGE_DEFAULT
+    try:
+        page = await response_cache.get_or_load(
+            ("mahasiswa", after, jurusan, angkatan, limit),
+            lambda: run_db(fetch_mahasiswa, after, jurusan, angkatan, limit, admission="list"),
+            CACHE_TTL["mahasiswa"],
+            tags=["mahasiswa"],
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    headers = {}
+    if page["next_after"] is not None:
+        next_url = request.url.include_query_params(after=page["next_after"])
+        headers["X-Next-After"] = page["next_after"]
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return ORJSONResponse(page["items"], headers=headers)
+
+
+MAHASISWA_EXISTS_QUERY = "SELECT 1 FROM mahasiswa WHERE nim = %s"
+
+
+@replica_read(lambda nim: (nim,))
+def mahasiswa_exists(pool, nim):
+    with get_db_connection(pool) as conn:
+        cursor = conn.cursor()
+        statements.execute(cursor, "mahasiswa_exists", MAHASISWA_EXISTS_QUERY, (nim,))
+        return cursor.fetchone() is not None
+
+
+@app.head("/api/acad/mahasiswa/{nim}")
+async def mahasiswa_head(nim: str):
+    # cek keberadaan NIM untuk halaman login, tanpa body dan biasanya tanpa
+    # query: NIM yang tidak ada di indeks langsung 404
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM mahasiswa")
-            rows = cursor.fetchall()
-
-            return [
-                {
-                    "nim": row[0],
-                    "nama": row[1],
-                    "jurusan": row[2],
-                    "angkatan": row[3],
-                }
-                for row in rows
-            ]
+        if not nim_index.ready:
+            found = await run_db(mahasiswa_exists, nim, admission="read")
+        elif nim in nim_index:
+            found = not nim_index.confirm_hits or await run_db(mahasiswa_exists, nim, admission="read")
+        else:
+            found = False
+    except HTTPException:
+        raise
+    except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+        # database tidak terjangkau: login boleh mencoba lagi, bukan 500
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(ADMISSION_RETRY_AFTER)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return Response(
+        status_code=200 if found else 404,
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+# IPS dibaca dari ips_summary (lihat migrations/0001_ips_summary.sql):
+# baris semester terakhir berisi akumulasi bobot dan sks seluruh krs mahasiswa
+IPS_QUERY = """
+    SELECT DISTINCT ON (m.nim)
+           m.nim, m.nama, m.jurusan, s.kumulatif_bobot, s.kumulatif_sks
+    FROM mahasiswa m
+    JOIN ips_summary s ON s.nim = m.nim
+    WHERE m.nim = ANY(%s)
+    ORDER BY m.nim, s.semester DESC
+"""
+
+
+def ips_from_row(row):
+    total_nilai, total_sks = row[3], row[4]
+    return {
+        "nim": row[0],
+        "nama": row[1],
+        "jurusan": row[2],
+        "ips": round(total_nilai / total_sks, 2) if total_sks else None,
+    }
+
+
+@replica_read(lambda nim: (nim,))
+def fetch_ips(pool, nim):
+    with get_db_connection(pool) as conn:
+        cursor = conn.cursor()
+        version, updated_at = read_version(cursor, nim)
+        statements.execute(cursor, "ips", IPS_QUERY, ([nim],))
+        row = cursor.fetchone()
+
+    if row is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Data mahasiswa tidak ditemukan"
+        )
+
+    if not row[4]:
+        raise HTTPException(
+            status_code=400,
+            detail="Total SKS tidak boleh nol"
+        )
+
+    return Versioned(version, updated_at, ips_from_row(row))
+
+
+@replica_read(lambda nims: nims)
+def fetch_ips_batch(pool, nims):
+    with get_db_connection(pool) as conn:
+        cursor = conn.cursor()
+        statements.execute(cursor, "ips_batch", IPS_QUERY, (nims,))
+        found = {row[0]: ips_from_row(row) for row in cursor.fetchall()}
+
+    return {
+        "results": [found[nim] for nim in nims if nim in found],
+        "not_found": [nim for nim in nims if nim not in found],
+    }
 
 
 @app.get("/api/acad/ips")
 async def get_ips(
+    request: Request,
     nim: str = Query(..., description="NIM Mahasiswa")
 ):
     try:
         # tambahkan konfigurasi Anda di sini
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
+        return await versioned_response(
+            request,
+            nim,
+            ("ips", nim),
+            lambda: run_db(fetch_ips, nim, admission="read"),
+            CACHE_TTL["ips"],
+            tags=[f"nim:{nim}"],
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-            query = """
-                SELECT m.nim, m.nama, m.jurusan, krs.nilai, mk.sks
-                FROM mahasiswa m
-                JOIN krs ON krs.nim = m.nim
-                JOIN mata_kuliah mk ON mk.kode_mk = krs.kode_mk
-                WHERE m.nim = %s
-            """
 
-            cursor.execute(query, (nim,))
-            rows = cursor.fetchall()
+@app.post("/api/acad/ips/batch")
+async def get_ips_batch(payload: IpsBatchRequest):
+    try:
+        nims = list(dict.fromkeys(payload.nims))
+        return ORJSONResponse(await run_db(fetch_ips_batch, nims, admission="read"))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-            if not rows:
-                raise HTTPException(
-                    status_code=404,
-                    detail="Data mahasiswa tidak ditemukan"
-                )
 
-        # ambil data untuk nilai dan sks
-        # jika A maka dikali 4, B+ dikali 3.5, B dikali 3,
-        # B- dikali 2.75, C+ dikali 2.5, C dikali 2,
-        # D dikali 1, E dikali 0
-        nilai_bobot = {
-            "A": 4.0,
-            "A-": 3.75,
-            "B+": 3.5,
-            "B": 3.0,
-            "B-": 2.75,
-            "C+": 2.5,
-            "C": 2.0,
-            "D": 1.0,
-            "E": 0.0,
-        }
-
-        total_sks = 0
-        total_nilai = 0
-
-        for row in rows:
-            nilai = row[3]
-            sks = row[4]
-            bobot = nilai_bobot.get(nilai, 0)
-
-            total_nilai += bobot * sks
-            total_sks += sks
-
-        if total_sks == 0:
-            raise HTTPException(
-                status_code=400,
-                detail="Total SKS tidak boleh nol"
-            )
+COURSE_NIMS_QUERY = "SELECT DISTINCT nim FROM krs WHERE kode_mk = %s"
+
 
-        ips = total_nilai / total_sks
+def fetch_nims_for_course(kode_mk):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        metrics.execute(cursor, "course_nims", COURSE_NIMS_QUERY, (kode_mk,))
+        return [row[0] for row in cursor.fetchall()]
 
-        return {
-            "nim": rows[0][0],
-            "nama": rows[0][1],
-            "jurusan": rows[0][2],
-            "ips": round(ips, 2),
-        }
 
+def invalidate_nim(nim):
+    # profil mahasiswa juga muncul di daftar mahasiswa dan statistik angkatan
+    return (
+        response_cache.invalidate(f"nim:{nim}")
+        + response_cache.invalidate("mahasiswa")
+        + response_cache.invalidate("cohort")
+    )
+
+
+def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Endpoint admin nonaktif: ACAD_ADMIN_TOKEN belum diatur")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(
+            status_code=401,
+            detail="Token admin tidak valid",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+async def invalidate_course(kode_mk):
+    # IPS tidak menyimpan daftar mata kuliah, jadi cari mahasiswa yang mengambilnya
+    removed = response_cache.invalidate(f"mk:{kode_mk}")
+    nims = await run_db(fetch_nims_for_course, kode_mk)
+    replicas.wrote(*nims)
+    for nim in nims:
+        removed += response_cache.invalidate(f"nim:{nim}")
+    # sks mata kuliah ikut menentukan IPS angkatan
+    return removed + response_cache.invalidate("cohort")
+
+
+@app.post("/api/acad/cache/invalidate")
+async def invalidate_cache(request: Request, payload: CacheInvalidateRequest):
+    require_admin(request)
+    try:
+        if payload.nim is None and payload.kode_mk is None:
+            return {"removed": response_cache.clear()}
+
+        removed = 0
+        if payload.nim is not None:
+            # data diubah di luar service, baca dari primary sampai replica menyusul
+            replicas.wrote(payload.nim)
+            removed += invalidate_nim(payload.nim)
+        if payload.kode_mk is not None:
+            removed += await invalidate_course(payload.kode_mk)
+        return {"removed": removed}
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Profil, IPS (dari ips_summary) dan seluruh nilai dalam satu query.
+# LEFT JOIN supaya mahasiswa tanpa krs tetap mendapat profil.
+DASHBOARD_QUERY = """
+    SELECT m.nim, m.nama, m.jurusan, m.angkatan,
+           s.kumulatif_bobot, s.kumulatif_sks,
+           mk.kode_mk, mk.nama_mk, mk.sks, krs.nilai, krs.semester
+    FROM mahasiswa m
+    LEFT JOIN LATERAL (
+        SELECT kumulatif_bobot, kumulatif_sks
+        FROM ips_summary
+        WHERE ips_summary.nim = m.nim
+        ORDER BY semester DESC
+        LIMIT 1
+    ) s ON true
+    LEFT JOIN (krs JOIN mata_kuliah mk ON mk.kode_mk = krs.kode_mk)
+      ON krs.nim = m.nim
+    WHERE m.nim = %s
+    ORDER BY krs.semester, mk.kode_mk
+"""
+
+
+@replica_read(lambda nim: (nim,))
+def fetch_dashboard(pool, nim):
+    with get_db_connection(pool) as conn:
+        cursor = conn.cursor()
+        version, updated_at = read_version(cursor, nim)
+        statements.execute(cursor, "dashboard", DASHBOARD_QUERY, (nim,))
+        rows = cursor.fetchall()
+
+    if not rows:
+        raise HTTPException(
+            status_code=404,
+            detail="Data mahasiswa tidak ditemukan"
+        )
+
+    first = rows[0]
+    return Versioned(version, updated_at, {
+        "nim": first[0],
+        "nama": first[1],
+        "jurusan": first[2],
+        "angkatan": first[3],
+        "ips": round(first[4] / first[5], 2) if first[5] else None,
+        "nilai": [
+            {
+                "kode_mk": row[6],
+                "nama_mk": row[7],
+                "sks": row[8],
+                "nilai": row[9],
+                "semester": row[10],
+            }
+            for row in rows
+            if row[6] is not None
+        ],
+    })
+
+
+@app.get("/api/acad/dashboard")
+async def get_dashboard(
+    request: Request,
+    nim: str = Query(..., description="NIM Mahasiswa"),
+):
+    try:
+        return await versioned_response(
+            request,
+            nim,
+            ("dashboard", nim),
+            lambda: run_db(fetch_dashboard, nim, admission="read"),
+            CACHE_TTL["dashboard"],
+            tags=[f"nim:{nim}"],
+            tags_of=lambda entry: [f"mk:{row['kode_mk']}" for row in entry.body["nilai"]],
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def sse_event(nim, version):
+    data = orjson.dumps({"nim": nim, "version": version}).decode()
+    return f"event: krs\nid: {version}\ndata: {data}\n\n"
+
+
+async def krs_event_stream(nim, queue, version):
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n" + sse_event(nim, version)
+        while True:
+            try:
+                version = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # comment line: keeps proxies from closing an idle stream and
+                # surfaces clients that went away
+                yield ": ping\n\n"
+                continue
+            if version is None:
+                return
+            yield sse_event(nim, version)
+    finally:
+        event_hub.unsubscribe(nim, queue)
+
+
+@app.get("/api/acad/events")
+async def krs_events(nim: str = Query(..., description="NIM Mahasiswa")):
+    # event "krs" dengan versi terbaru setiap kali data mahasiswa berubah;
+    # event pertama membawa versi saat ini
+    try:
+        queue = event_hub.subscribe(nim)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server sedang sibuk ({e}), coba lagi",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    try:
+        version, _ = await run_db(fetch_version, nim, admission="read")
+    except BaseException:
+        event_hub.unsubscribe(nim, queue)
+        raise
+
+    stream = krs_event_stream(nim, queue, version)
+    # the finally above never runs if the stream is never started
+    weakref.finalize(stream, event_hub.unsubscribe, nim, queue)
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def require_ranking():
+    if not ranking.ready:
+        raise HTTPException(
+            status_code=503,
+            detail="Peringkat belum siap, coba lagi",
+            headers={"Retry-After": str(int(RANKING_REFRESH) or 1)},
+        )
+
+
+@app.get("/api/acad/ranking/top")
+async def get_ranking_top(
+    jurusan: str = Query(...),
+    angkatan: int = Query(...),
+    k: int = Query(10, ge=1, le=RANKING_TOP_MAX),
+):
+    require_ranking()
+    return ORJSONResponse(ranking.top(jurusan, angkatan, k))
+
+
+@app.get("/api/acad/ranking/rank")
+async def get_ranking_rank(nim: str = Query(..., description="NIM Mahasiswa")):
+    require_ranking()
+    standing = ranking.rank_of(nim)
+    if standing is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Mahasiswa tidak ditemukan atau belum memiliki IPS"
+        )
+    return ORJSONResponse(standing)
+
+
+@replica_read()
+def fetch_cohort(pool, jurusan, angkatan, semester):
+    query, params = analytics.cohort_query(jurusan, angkatan, semester)
+    with get_db_connection(pool) as conn:
+        cursor = conn.cursor()
+        metrics.execute(cursor, "cohort", query, params)
+        return [analytics.cohort_from_row(row) for row in cursor.fetchall()]
+
+
+@app.get("/api/acad/analytics/cohort")
+async def get_cohort(
+    jurusan: Optional[str] = Query(None),
+    angkatan: Optional[int] = Query(None),
+    semester: Optional[int] = Query(None, ge=1),
+):
+    try:
+        groups = await response_cache.get_or_load(
+            ("cohort", jurusan, angkatan, semester),
+            lambda: run_db(fetch_cohort, jurusan, angkatan, semester, admission="list"),
+            CACHE_TTL["cohort"],
+            tags=["cohort"],
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return ORJSONResponse(groups)
+
+
+def ingest_krs(stream, fmt):
+    with get_db_connection() as conn:
+        return ingest(conn, stream, fmt)
+
+
+@app.post("/api/acad/krs/bulk")
+async def bulk_ingest_krs(
+    request: Request,
+    response: Response,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+):
+    require_admin(request)
+    # slot diambil sebelum upload: klien yang ditolak tidak sempat mengirim body
+    async with admitted("write"):
+        spool = tempfile.SpooledTemporaryFile(max_size=INGEST_SPOOL_MAX)
+        try:
+            async for chunk in request.stream():
+                spool.write(chunk)
+            spool.seek(0)
+
+            report = await run_db(ingest_krs, spool, format)
+        except IngestError as e:
+            raise HTTPException(status_code=422, detail={"errors": e.errors})
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            spool.close()
+
+    nims = report.pop("nims")
+    replicas.wrote(*nims)
+    for nim in nims:
+        invalidate_nim(nim)
+    if replicas.replicas and DB_READ_STICKY_SECONDS > 0:
+        # read-your-writes: bacaan berikutnya dari klien ini ke primary
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            "1",
+            max_age=max(1, int(DB_READ_STICKY_SECONDS)),
+            httponly=True,
+            samesite="lax",
+        )
+    report["students"] = len(nims)
+    return report
+
+
+@app.get("/api/acad/export/transkrip", dependencies=[Depends(require_admin)])
+async def export_transkrip(
+    jurusan: Optional[str] = Query(None),
+    angkatan: Optional[int] = Query(None),
+    semester: Optional[int] = Query(None),
+    format: str = Query("csv", pattern="^(csv|arrow)$"),
+):
+    query, params = export.transkrip_query(jurusan, angkatan, semester)
+    pool = replicas.for_read()
+    get_connection = functools.partial(get_db_connection, pool)
+
+    if format == "arrow":
+        if export.pa is None:
+            raise HTTPException(
+                status_code=501,
+                detail="format=arrow membutuhkan paket pyarrow"
+            )
+        return StreamingResponse(
+            guarded_stream(await admit("export"), export.arrow_chunks(get_connection, query, params)),
+            media_type="application/vnd.apache.arrow.stream",
+            headers={"Content-Disposition": 'attachment; filename="transkrip.arrows"'},
+        )
+
+    return StreamingResponse(
+        guarded_stream(await admit("export"), export.copy_csv_chunks(get_connection, db_executor, query, params)),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="transkrip.csv"'},
+    )
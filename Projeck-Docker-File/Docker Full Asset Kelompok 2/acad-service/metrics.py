@@ -0,0 +1,222 @@
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labels, label_values, ("le", bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render_values(name, help_text, metric_type, values):
+    # for values owned by other components (pool, cache), read at scrape time
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for label, value in values:
+        lines.append(f"{name}{_format_labels(('kind',), (label,))} {value}")
+    return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "acad_http_request_duration_seconds",
+    "HTTP request latency by route template and method",
+    labels=("route", "method"),
+)
+HTTP_REQUESTS = Counter(
+    "acad_http_requests_total",
+    "HTTP responses by route template, method and status",
+    labels=("route", "method", "status"),
+)
+DB_QUERY_SECONDS = Histogram(
+    "acad_db_query_duration_seconds",
+    "Query execution time (execute + fetch) by query name",
+    labels=("query",),
+)
+DB_QUERY_ERRORS = Counter(
+    "acad_db_query_errors_total",
+    "Queries that raised, by query name",
+    labels=("query",),
+)
+DB_CONNECT_SECONDS = Histogram(
+    "acad_db_connect_duration_seconds",
+    "Time to open a new PostgreSQL connection (TCP + auth)",
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "acad_db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection",
+)
+DB_READS = Counter(
+    "acad_db_reads_total",
+    "Read-only connection checkouts by target pool and routing reason",
+    labels=("target", "reason"),
+)
+DB_SLOW_QUERIES = Counter(
+    "acad_db_slow_queries_total",
+    "Sampled queries slower than SLOW_QUERY_MS, by query name",
+    labels=("query",),
+)
+DB_PREPARES = Counter(
+    "acad_db_prepares_total",
+    "PREPAREs issued on pooled connections, by query name and reason (first, invalidated)",
+    labels=("query", "reason"),
+)
+
+REGISTRY = [
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS,
+    DB_QUERY_SECONDS,
+    DB_QUERY_ERRORS,
+    DB_CONNECT_SECONDS,
+    DB_POOL_WAIT_SECONDS,
+    DB_READS,
+    DB_SLOW_QUERIES,
+    DB_PREPARES,
+]
+
+# called as hook(cursor, name, query, params, seconds) after every successful
+# execute(); profiler.SlowQueryLog.observe registers itself here. For an
+# EXECUTE of a prepared statement the hooks get the original query text
+# (source), which the parameters still fit
+QUERY_HOOKS = []
+
+
+def execute(cursor, name, query, params=None, source=None):
+    started = time.perf_counter()
+    try:
+        cursor.execute(query, params)
+    except Exception:
+        DB_QUERY_ERRORS.inc(name)
+        DB_QUERY_SECONDS.observe(name, value=time.perf_counter() - started)
+        raise
+    seconds = time.perf_counter() - started
+    DB_QUERY_SECONDS.observe(name, value=seconds)
+    for hook in QUERY_HOOKS:
+        hook(cursor, name, source or query, params, seconds)
+
+
+def render(extra_lines=()):
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
+
+
+_templates = {}
+
+
+def _route_template(scope):
+    # starlette 0.27 leaves only the matched endpoint in the scope; find its
+    # route so /api/acad/mahasiswa/{nim} is one label, not one per NIM
+    endpoint = scope.get("endpoint")
+    router = scope.get("router")
+    if endpoint is None or router is None:
+        return "<unmatched>"
+    template = _templates.get(endpoint)
+    if template is None:
+        for route in router.routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                template = _templates[endpoint] = route.path
+                break
+        else:
+            return "<unmatched>"
+    return template
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware (no BaseHTTPMiddleware) so streaming responses
+    # are not buffered and the per-request cost stays a couple of dict ops
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # the router stores the matched route in the (shared) scope;
+            # unmatched paths are folded together to keep cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", None)
+            if route_path is None:
+                route_path = _route_template(scope)
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(route_path, method, value=time.perf_counter() - started)
+            HTTP_REQUESTS.inc(route_path, method, str(status))
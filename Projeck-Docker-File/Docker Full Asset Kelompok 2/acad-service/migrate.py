@@ -0,0 +1,209 @@
+import argparse
+import hashlib
+import os
+import re
+import time
+
+import psycopg2
+
+# Migrasi berjalan di atas skema dasar dari db_kelas.sql (mahasiswa,
+# mata_kuliah, krs, bobot_nilai). File bernama NNNN_nama.sql, diterapkan
+# berurutan dan dicatat di schema_migrations.
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+NO_TRANSACTION = "-- migrate: no-transaction"
+
+# pg_advisory_lock key, only one process (worker/CLI) migrates at a time
+LOCK_KEY = 4711001
+
+# a failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, which
+# IF NOT EXISTS would then skip for good
+CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)",
+    re.IGNORECASE,
+)
+INVALID_INDEX_QUERY = """
+    SELECT 1
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = %s AND pg_table_is_visible(c.oid) AND NOT i.indisvalid
+"""
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path) as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode()).hexdigest()
+        self.transactional = not self.sql.lstrip().startswith(NO_TRANSACTION)
+
+    def statements(self):
+        # no-transaction migrations are sent one statement at a time, since a
+        # multi-statement query string runs as one implicit transaction
+        statement = []
+        for line in self.sql.splitlines():
+            if line.strip().startswith("--") and not statement:
+                continue
+            statement.append(line)
+            if line.rstrip().endswith(";"):
+                yield "\n".join(statement)
+                statement = []
+        if "".join(statement).strip():
+            yield "\n".join(statement)
+
+
+def discover(directory=MIGRATIONS_DIR):
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"duplicate migration version {version}: {filename}")
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename))
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def ensure_table(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            duration_ms DOUBLE PRECISION NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    conn.commit()
+
+
+def applied_versions(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version")
+    rows = cursor.fetchall()
+    conn.commit()
+    return {row[0]: row for row in rows}
+
+
+def drop_invalid_index(cursor, statement, log=print):
+    match = CONCURRENT_INDEX.search(statement)
+    if match is None:
+        return
+    cursor.execute(INVALID_INDEX_QUERY, (match.group(1),))
+    if cursor.fetchone() is not None:
+        log(f"dropping invalid index {match.group(1)} left by an earlier failed build")
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}")
+
+
+def apply(conn, migration, log=print):
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    if migration.transactional:
+        cursor.execute(migration.sql)
+    else:
+        conn.autocommit = True
+        try:
+            for statement in migration.statements():
+                drop_invalid_index(cursor, statement, log)
+                cursor.execute(statement)
+        finally:
+            conn.autocommit = False
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    cursor.execute(
+        "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s)",
+        (migration.version, migration.name, migration.checksum, duration_ms),
+    )
+    conn.commit()
+    return duration_ms
+
+
+def migrate(conn, target=None, log=print):
+    # The session lock is taken in autocommit: a runner waiting for it must
+    # not sit in an open transaction, because CREATE INDEX CONCURRENTLY in
+    # the runner holding the lock waits for every open transaction to end
+    # (a deadlock). Everything else, schema_migrations included, happens
+    # only under the lock.
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+    conn.autocommit = False
+    try:
+        ensure_table(conn)
+        # read applied versions only after taking the lock, another process
+        # may have just finished the same migrations
+        applied = applied_versions(conn)
+        done = []
+        for migration in discover():
+            if target is not None and migration.version > target:
+                break
+            if migration.version in applied:
+                if applied[migration.version][2] != migration.checksum:
+                    log(f"migration {migration.version}_{migration.name}: file changed after it was applied")
+                continue
+            try:
+                duration_ms = apply(conn, migration, log)
+            except Exception as e:
+                conn.rollback()
+                raise MigrationError(f"migration {migration.version}_{migration.name} failed: {e}")
+            log(f"applied {migration.version}_{migration.name} ({duration_ms:.0f} ms)")
+            done.append(migration.version)
+        return done
+    finally:
+        conn.rollback()
+        conn.autocommit = True
+        try:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+        finally:
+            conn.autocommit = False
+
+
+def status(conn):
+    ensure_table(conn)
+    applied = applied_versions(conn)
+    return [
+        {
+            "version": migration.version,
+            "name": migration.name,
+            "applied_at": applied[migration.version][3].isoformat() if migration.version in applied else None,
+            "changed": migration.version in applied and applied[migration.version][2] != migration.checksum,
+        }
+        for migration in discover()
+    ]
+
+
+def main():
+    # DB_CONFIG is read from main so the CLI uses the same env vars as the service
+    from main import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Jalankan migrasi skema acad-service")
+    parser.add_argument("command", nargs="?", default="up", choices=["up", "status"])
+    parser.add_argument("--target", type=int, default=None, help="berhenti setelah versi ini")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        if args.command == "up":
+            done = migrate(conn, args.target)
+            print(f"{len(done)} migration(s) applied")
+        else:
+            for row in status(conn):
+                state = row["applied_at"] or "pending"
+                if row["changed"]:
+                    state += " (changed)"
+                print(f"{row['version']:04d}_{row['name']}: {state}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+-- Ringkasan IPS/IPK per mahasiswa per semester, dijaga oleh trigger pada krs
+CREATE TABLE IF NOT EXISTS ips_summary (
+    nim VARCHAR(10) NOT NULL REFERENCES mahasiswa(nim) ON DELETE CASCADE,
+    semester INT NOT NULL,
+    total_sks INT NOT NULL,
+    total_bobot DOUBLE PRECISION NOT NULL,
+    ips DOUBLE PRECISION,
+    kumulatif_sks INT NOT NULL,
+    kumulatif_bobot DOUBLE PRECISION NOT NULL,
+    ipk DOUBLE PRECISION,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (nim, semester)
+);
+
+-- Perhitungan langsung dari krs, dipakai untuk refresh dan pengecekan konsistensi
+CREATE OR REPLACE VIEW ips_summary_raw AS
+SELECT nim, semester, total_sks, total_bobot,
+       total_bobot / NULLIF(total_sks, 0) AS ips,
+       (SUM(total_sks) OVER w)::INT AS kumulatif_sks,
+       SUM(total_bobot) OVER w AS kumulatif_bobot,
+       SUM(total_bobot) OVER w / NULLIF(SUM(total_sks) OVER w, 0) AS ipk
+FROM (
+    SELECT krs.nim, COALESCE(krs.semester, 0) AS semester,
+           SUM(mk.sks)::INT AS total_sks,
+           SUM(COALESCE(b.bobot, 0) * mk.sks) AS total_bobot
+    FROM krs
+    JOIN mata_kuliah mk ON mk.kode_mk = krs.kode_mk
+    LEFT JOIN bobot_nilai b ON b.nilai = krs.nilai
+    WHERE krs.nim IS NOT NULL
+    GROUP BY krs.nim, COALESCE(krs.semester, 0)
+) per_semester
+WINDOW w AS (PARTITION BY nim ORDER BY semester);
+
+CREATE OR REPLACE FUNCTION refresh_ips_summary(p_nims VARCHAR[]) RETURNS void AS $$
+BEGIN
+    -- Kunci per nim (urut agar tidak deadlock) supaya dua transaksi yang
+    -- mengubah krs mahasiswa yang sama tidak saling menimpa ringkasan
+    PERFORM pg_advisory_xact_lock(hashtext('ips_summary:' || n))
+    FROM (SELECT DISTINCT unnest(p_nims) AS n ORDER BY 1) locked;
+
+    DELETE FROM ips_summary WHERE nim = ANY(p_nims);
+    INSERT INTO ips_summary (nim, semester, total_sks, total_bobot, ips,
+                             kumulatif_sks, kumulatif_bobot, ipk)
+    SELECT nim, semester, total_sks, total_bobot, ips,
+           kumulatif_sks, kumulatif_bobot, ipk
+    FROM ips_summary_raw
+    WHERE nim = ANY(p_nims);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rebuild_ips_summary() RETURNS BIGINT AS $$
+DECLARE
+    total BIGINT;
+BEGIN
+    LOCK TABLE krs IN SHARE MODE;
+    DELETE FROM ips_summary;
+    INSERT INTO ips_summary (nim, semester, total_sks, total_bobot, ips,
+                             kumulatif_sks, kumulatif_bobot, ipk)
+    SELECT nim, semester, total_sks, total_bobot, ips,
+           kumulatif_sks, kumulatif_bobot, ipk
+    FROM ips_summary_raw;
+    GET DIAGNOSTICS total = ROW_COUNT;
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level trigger: satu refresh per statement untuk semua nim yang berubah,
+-- sehingga INSERT massal tidak menghitung ulang per baris
+CREATE OR REPLACE FUNCTION krs_refresh_ips_summary() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_ips_summary(ARRAY(
+            SELECT DISTINCT nim FROM new_rows WHERE nim IS NOT NULL));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM refresh_ips_summary(ARRAY(
+            SELECT nim FROM new_rows WHERE nim IS NOT NULL
+            UNION
+            SELECT nim FROM old_rows WHERE nim IS NOT NULL));
+    ELSE
+        PERFORM refresh_ips_summary(ARRAY(
+            SELECT DISTINCT nim FROM old_rows WHERE nim IS NOT NULL));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION mata_kuliah_refresh_ips_summary() RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_ips_summary(ARRAY(
+        SELECT DISTINCT krs.nim
+        FROM krs
+        JOIN new_rows ON new_rows.kode_mk = krs.kode_mk
+        JOIN old_rows ON old_rows.kode_mk = new_rows.kode_mk
+        WHERE new_rows.sks IS DISTINCT FROM old_rows.sks
+          AND krs.nim IS NOT NULL));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS krs_ips_summary_insert ON krs;
+CREATE TRIGGER krs_ips_summary_insert
+    AFTER INSERT ON krs
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION krs_refresh_ips_summary();
+
+DROP TRIGGER IF EXISTS krs_ips_summary_update ON krs;
+CREATE TRIGGER krs_ips_summary_update
+    AFTER UPDATE ON krs
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION krs_refresh_ips_summary();
+
+DROP TRIGGER IF EXISTS krs_ips_summary_delete ON krs;
+CREATE TRIGGER krs_ips_summary_delete
+    AFTER DELETE ON krs
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION krs_refresh_ips_summary();
+
+DROP TRIGGER IF EXISTS mata_kuliah_ips_summary_update ON mata_kuliah;
+CREATE TRIGGER mata_kuliah_ips_summary_update
+    AFTER UPDATE ON mata_kuliah
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mata_kuliah_refresh_ips_summary();
+
+SELECT rebuild_ips_summary();
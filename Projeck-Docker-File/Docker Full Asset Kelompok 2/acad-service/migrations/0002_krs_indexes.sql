@@ -0,0 +1,16 @@
+-- migrate: no-transaction
+-- Index untuk jalur panas krs. CONCURRENTLY agar tabel tetap bisa ditulis
+-- selama index dibangun, karena itu migrasi ini berjalan di luar transaksi.
+
+-- /api/acad/ips, /api/acad/nilai-matkul, /api/acad/dashboard dan refresh
+-- ips_summary memfilter krs per nim lalu mengurutkan per semester, kode_mk
+CREATE INDEX CONCURRENTLY IF NOT EXISTS krs_nim_semester_kode_mk_idx
+    ON krs (nim, semester, kode_mk);
+
+-- invalidasi cache per mata kuliah dan trigger mata_kuliah mencari krs per kode_mk
+CREATE INDEX CONCURRENTLY IF NOT EXISTS krs_kode_mk_idx
+    ON krs (kode_mk);
+
+-- filter jurusan/angkatan pada /api/acad/mahasiswa, tetap terurut per nim
+CREATE INDEX CONCURRENTLY IF NOT EXISTS mahasiswa_jurusan_angkatan_nim_idx
+    ON mahasiswa (jurusan, angkatan, nim);
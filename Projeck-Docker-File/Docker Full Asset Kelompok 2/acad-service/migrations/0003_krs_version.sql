@@ -0,0 +1,95 @@
+-- Versi data akademik per mahasiswa untuk ETag/Last-Modified. Naik setiap kali
+-- krs mahasiswa, profilnya, atau mata kuliah yang diambilnya berubah.
+CREATE TABLE IF NOT EXISTS krs_version (
+    nim VARCHAR(10) PRIMARY KEY REFERENCES mahasiswa(nim) ON DELETE CASCADE,
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO krs_version (nim, version)
+SELECT nim, 1 FROM mahasiswa
+ON CONFLICT (nim) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_krs_version(p_nims VARCHAR[]) RETURNS void AS $$
+    INSERT INTO krs_version (nim, version, updated_at)
+    SELECT DISTINCT n, 1, now()
+    FROM unnest(p_nims) n
+    WHERE n IS NOT NULL
+    ORDER BY n
+    ON CONFLICT (nim) DO UPDATE
+    SET version = krs_version.version + 1,
+        updated_at = now();
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION krs_bump_version() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_krs_version(ARRAY(SELECT nim FROM new_rows));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM bump_krs_version(ARRAY(
+            SELECT nim FROM new_rows UNION SELECT nim FROM old_rows));
+    ELSE
+        PERFORM bump_krs_version(ARRAY(
+            SELECT nim FROM old_rows
+            WHERE EXISTS (SELECT 1 FROM mahasiswa m WHERE m.nim = old_rows.nim)));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION mahasiswa_bump_version() RETURNS trigger AS $$
+BEGIN
+    PERFORM bump_krs_version(ARRAY(SELECT nim FROM new_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION mata_kuliah_bump_version() RETURNS trigger AS $$
+BEGIN
+    PERFORM bump_krs_version(ARRAY(
+        SELECT DISTINCT krs.nim
+        FROM krs
+        JOIN new_rows ON new_rows.kode_mk = krs.kode_mk
+        JOIN old_rows ON old_rows.kode_mk = new_rows.kode_mk
+        WHERE new_rows.sks IS DISTINCT FROM old_rows.sks
+           OR new_rows.nama_mk IS DISTINCT FROM old_rows.nama_mk));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS krs_version_insert ON krs;
+CREATE TRIGGER krs_version_insert
+    AFTER INSERT ON krs
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION krs_bump_version();
+
+DROP TRIGGER IF EXISTS krs_version_update ON krs;
+CREATE TRIGGER krs_version_update
+    AFTER UPDATE ON krs
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION krs_bump_version();
+
+DROP TRIGGER IF EXISTS krs_version_delete ON krs;
+CREATE TRIGGER krs_version_delete
+    AFTER DELETE ON krs
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION krs_bump_version();
+
+-- mahasiswa baru juga mendapat baris versi, supaya profil tanpa krs punya ETag
+DROP TRIGGER IF EXISTS mahasiswa_version_insert ON mahasiswa;
+CREATE TRIGGER mahasiswa_version_insert
+    AFTER INSERT ON mahasiswa
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mahasiswa_bump_version();
+
+DROP TRIGGER IF EXISTS mahasiswa_version_update ON mahasiswa;
+CREATE TRIGGER mahasiswa_version_update
+    AFTER UPDATE ON mahasiswa
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mahasiswa_bump_version();
+
+DROP TRIGGER IF EXISTS mata_kuliah_version_update ON mata_kuliah;
+CREATE TRIGGER mata_kuliah_version_update
+    AFTER UPDATE ON mata_kuliah
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mata_kuliah_bump_version();
@@ -0,0 +1,31 @@
+-- NOTIFY krs_version setiap kali versi mahasiswa naik (lihat 0003), supaya
+-- service bisa membatalkan cache dan mendorong event SSE tanpa polling.
+-- Payload: "nim:versi,nim:versi,...", dipecah per 200 mahasiswa agar tetap
+-- di bawah batas 8000 byte payload NOTIFY. Notifikasi baru terkirim saat
+-- transaksi commit.
+CREATE OR REPLACE FUNCTION krs_version_notify() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('krs_version', chunk)
+    FROM (
+        SELECT string_agg(nim || ':' || version, ',' ORDER BY nim) AS chunk
+        FROM (
+            SELECT nim, version, (row_number() OVER (ORDER BY nim) - 1) / 200 AS bucket
+            FROM new_rows
+        ) numbered
+        GROUP BY bucket
+    ) chunks;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS krs_version_notify_insert ON krs_version;
+CREATE TRIGGER krs_version_notify_insert
+    AFTER INSERT ON krs_version
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION krs_version_notify();
+
+DROP TRIGGER IF EXISTS krs_version_notify_update ON krs_version;
+CREATE TRIGGER krs_version_notify_update
+    AFTER UPDATE ON krs_version
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION krs_version_notify();
@@ -0,0 +1,149 @@
+import hashlib
+import math
+import threading
+import time
+
+# new and changed students since the watermark; krs_version.updated_at is the
+# transaction start time, so the window overlaps by REFRESH_OVERLAP to catch
+# rows committed after a later refresh already ran
+CHANGED_QUERY = """
+    SELECT v.nim, v.updated_at
+    FROM krs_version v
+    WHERE v.updated_at > %s - make_interval(secs => %s)
+"""
+ALL_QUERY = "SELECT nim FROM mahasiswa"
+WATERMARK_QUERY = "SELECT COALESCE(MAX(updated_at), now()) FROM krs_version"
+
+REFRESH_OVERLAP = 60.0
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # double hashing (Kirsch-Mitzenmacher) from one blake2b digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class NimIndex:
+    # In-memory set of every mahasiswa.nim, so an existence check does not
+    # need a connection. load() reads the whole table, refresh() only the
+    # krs_version rows touched since the last call; deleted students linger
+    # until the next full load. With bloom=True the set is replaced by a
+    # Bloom filter: a fraction of the memory, but a hit is only "probably"
+    # and must be confirmed against the database (see confirm_hits).
+    def __init__(self, bloom=False, error_rate=0.001):
+        self.bloom = bloom
+        self.error_rate = error_rate
+        self._members = None
+        self._watermark = None
+        self._lock = threading.Lock()
+        self.loaded_at = None
+        self.refreshed_at = None
+        self.loads = 0
+        self.refreshes = 0
+        self.added = 0
+
+    @property
+    def ready(self):
+        return self._members is not None
+
+    @property
+    def watermark(self):
+        # newest krs_version.updated_at seen; advances whenever any
+        # student's data changed, also through writes outside this process
+        return self._watermark
+
+    @property
+    def confirm_hits(self):
+        return self.bloom
+
+    def _new_members(self, nims):
+        if not self.bloom:
+            return set(nims)
+        # headroom for students added between full loads
+        members = BloomFilter(len(nims) * 2 + 1024, self.error_rate)
+        for nim in nims:
+            members.add(nim)
+        return members
+
+    def load(self, conn):
+        cursor = conn.cursor()
+        cursor.execute(WATERMARK_QUERY)
+        watermark = cursor.fetchone()[0]
+        cursor.execute(ALL_QUERY)
+        members = self._new_members([row[0] for row in cursor.fetchall()])
+
+        with self._lock:
+            self._members = members
+            self._watermark = watermark
+            self.loaded_at = self.refreshed_at = time.time()
+            self.loads += 1
+        return len(self)
+
+    def refresh(self, conn):
+        if not self.ready:
+            return self.load(conn)
+
+        cursor = conn.cursor()
+        cursor.execute(CHANGED_QUERY, (self._watermark, REFRESH_OVERLAP))
+        rows = cursor.fetchall()
+
+        added = 0
+        with self._lock:
+            for nim, updated_at in rows:
+                if nim not in self._members:
+                    self._members.add(nim)
+                    added += 1
+                if updated_at > self._watermark:
+                    self._watermark = updated_at
+            self.refreshed_at = time.time()
+            self.refreshes += 1
+            self.added += added
+        return added
+
+    def __contains__(self, nim):
+        members = self._members
+        return members is not None and nim in members
+
+    def __len__(self):
+        members = self._members
+        if members is None:
+            return 0
+        return members.count if self.bloom else len(members)
+
+    def stats(self):
+        members = self._members
+        result = {
+            "ready": self.ready,
+            "mode": "bloom" if self.bloom else "set",
+            "size": len(self),
+            "loads": self.loads,
+            "refreshes": self.refreshes,
+            "added": self.added,
+            "loaded_at": self.loaded_at,
+            "refreshed_at": self.refreshed_at,
+        }
+        if self.bloom and members is not None:
+            result["bloom_bits"] = members.size
+            result["bloom_hashes"] = members.hashes
+            result["bloom_capacity"] = members.capacity
+        return result
@@ -0,0 +1,558 @@
+import gzip
+import hashlib
+import os
+
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PAGE_MAX_AGE = int(os.getenv("PAGE_MAX_AGE", "60"))
+
+# encodings in server preference order
+PREFERRED_ENCODINGS = ("br", "gzip", "identity")
+
+
+def parse_accept_encoding(header):
+    weights = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[token] = weight
+    return weights
+
+
+def choose_encoding(header, available):
+    weights = parse_accept_encoding(header)
+    wildcard = weights.get("*")
+    for encoding in PREFERRED_ENCODINGS:
+        if encoding not in available:
+            continue
+        weight = weights.get(encoding, wildcard)
+        if weight is None:
+            # identity is acceptable unless explicitly refused
+            weight = 1.0 if encoding == "identity" else 0.0
+        if weight > 0:
+            return encoding
+    return "identity"
+
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class StaticPage:
+    # The page is encoded and compressed once at import, every request only
+    # picks a prebuilt variant; the API calls inside the page stay dynamic
+    def __init__(self, html, media_type="text/html; charset=utf-8", max_age=PAGE_MAX_AGE):
+        body = html.encode()
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.media_type = media_type
+        self.cache_control = f"private, max-age={max_age}, must-revalidate"
+        # a strong ETag names exact bytes, so each encoding gets its own
+        self.variants = {
+            "identity": (body, f'"{digest}"'),
+            "gzip": (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"'),
+        }
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+
+    def response(self, request):
+        encoding = choose_encoding(request.headers.get("accept-encoding"), self.variants)
+        body, etag = self.variants[encoding]
+        headers = {
+            "ETag": etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+DASHBOARD_HTML = """\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Dashboard Mahasiswa</title>
+    <style>
+        :root {
+            --primary-dark: #005461;
+            --primary: #018790;
+            --accent: #00B7B5;
+            --light-bg: #F4F4F4;
+        }
+
+        body {
+            font-family: Arial, sans-serif;
+            margin: 0;
+            padding: 0;
+            background-color: var(--light-bg);
+            color: #333;
+        }
+
+        .header {
+            background-color: var(--primary-dark);
+            color: white;
+            padding: 15px 20px;
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+        }
+
+        .container {
+            max-width: 1200px;
+            margin: 20px auto;
+            padding: 20px;
+        }
+
+        .dashboard-card {
+            background-color: white;
+            padding: 25px;
+            border-radius: 8px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+            margin-bottom: 20px;
+        }
+
+        h1, h2 {
+            color: var(--primary-dark);
+            margin-top: 0;
+        }
+
+        .info-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 15px;
+            margin: 20px 0;
+        }
+
+        .info-item {
+            background-color: var(--light-bg);
+            padding: 15px;
+            border-radius: 5px;
+            text-align: center;
+        }
+
+        .info-label {
+            font-weight: bold;
+            color: var(--primary);
+            margin-bottom: 5px;
+        }
+
+        .info-value {
+            font-size: 1.2em;
+            color: var(--primary-dark);
+        }
+
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-top: 20px;
+        }
+
+        th, td {
+            padding: 12px;
+            text-align: left;
+            border-bottom: 1px solid #ddd;
+        }
+
+        th {
+            background-color: var(--primary);
+            color: white;
+        }
+
+        tr:hover {
+            background-color: var(--light-bg);
+        }
+
+        .logout-btn {
+            background-color: var(--primary);
+            color: white;
+            border: none;
+            padding: 10px 20px;
+            border-radius: 5px;
+            cursor: pointer;
+            font-size: 14px;
+        }
+
+        .logout-btn:hover {
+            background-color: var(--accent);
+        }
+
+        @media (max-width: 768px) {
+            .info-grid {
+                grid-template-columns: 1fr;
+            }
+
+            .header {
+                flex-direction: column;
+                text-align: center;
+            }
+
+            .container {
+                padding: 15px;
+            }
+
+            table {
+                font-size: 14px;
+            }
+
+            th, td {
+                padding: 8px;
+            }
+        }
+
+        @media (max-width: 480px) {
+            table {
+                font-size: 12px;
+            }
+
+            th, td {
+                padding: 6px;
+            }
+
+            .dashboard-card {
+                padding: 15px;
+            }
+        }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>Dashboard Mahasiswa</h1>
+        <button class="logout-btn" onclick="logout()">Logout</button>
+    </div>
+
+    <div class="container">
+        <div class="dashboard-card">
+            <h2>Informasi Mahasiswa</h2>
+            <div class="info-grid">
+                <div class="info-item">
+                    <div class="info-label">NIM</div>
+                    <div class="info-value" id="nim-display">-</div>
+                </div>
+                <div class="info-item">
+                    <div class="info-label">Nama</div>
+                    <div class="info-value" id="nama-display">-</div>
+                </div>
+                <div class="info-item">
+                    <div class="info-label">Jurusan</div>
+                    <div class="info-value" id="jurusan-display">-</div>
+                </div>
+                <div class="info-item">
+                    <div class="info-label">IPS</div>
+                    <div class="info-value" id="ips-display">-</div>
+                </div>
+            </div>
+        </div>
+
+        <div class="dashboard-card">
+            <h2>Nilai Mata Kuliah</h2>
+            <table id="nilai-table">
+                <thead>
+                    <tr>
+                        <th>Kode MK</th>
+                        <th>Nama Mata Kuliah</th>
+                        <th>SKS</th>
+                        <th>Nilai</th>
+                        <th>Semester</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    <!-- Nilai akan dimuat di sini -->
+                </tbody>
+            </table>
+        </div>
+    </div>
+
+    <script>
+        let nim = null;
+        let renderedVersion = null;
+
+        async function loadDashboard(quiet = false) {
+            try {
+                const urlParams = new URLSearchParams(window.location.search);
+                nim = urlParams.get('nim');
+
+                if (!nim) {
+                    window.location.href = '/login';
+                    return;
+                }
+
+                // Get student info, IPS and all grades in one request
+                const response = await fetch(`/api/acad/dashboard?nim=${nim}`);
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                const data = await response.json();
+
+                // ETag W/"<nim>.<version>": version of the data on screen
+                const etag = response.headers.get('ETag') || '';
+                const match = etag.match(/\.(\d+)"$/);
+                renderedVersion = match ? Number(match[1]) : null;
+
+                document.getElementById('nim-display').textContent = data.nim;
+                document.getElementById('nama-display').textContent = data.nama;
+                document.getElementById('jurusan-display').textContent = data.jurusan;
+                document.getElementById('ips-display').textContent = data.ips ?? '-';
+
+                const tbody = document.querySelector('#nilai-table tbody');
+                tbody.innerHTML = '';
+
+                data.nilai.forEach(nilai => {
+                    const row = document.createElement('tr');
+                    row.innerHTML = `
+                        <td>${nilai.kode_mk}</td>
+                        <td>${nilai.nama_mk}</td>
+                        <td>${nilai.sks}</td>
+                        <td>${nilai.nilai}</td>
+                        <td>${nilai.semester}</td>
+                    `;
+                    tbody.appendChild(row);
+                });
+
+            } catch (error) {
+                console.error('Error loading dashboard:', error);
+                if (!quiet) {
+                    alert('Terjadi kesalahan saat memuat data');
+                }
+            }
+        }
+
+        const POLL_INTERVAL = 30000;
+        const RETRY_MAX = 60000;
+        let retryDelay = 1000;
+        let pollTimer = null;
+
+        function startPolling() {
+            if (pollTimer === null) {
+                pollTimer = setInterval(() => loadDashboard(true), POLL_INTERVAL);
+            }
+        }
+
+        function stopPolling() {
+            if (pollTimer !== null) {
+                clearInterval(pollTimer);
+                pollTimer = null;
+            }
+        }
+
+        function subscribe() {
+            // reload the data when the server reports a newer version; the
+            // fetch revalidates with If-None-Match, so it is cheap
+            if (!nim) {
+                return;
+            }
+            if (!window.EventSource) {
+                startPolling();
+                return;
+            }
+            const events = new EventSource(`/api/acad/events?nim=${encodeURIComponent(nim)}`);
+            events.addEventListener('open', () => {
+                retryDelay = 1000;
+                stopPolling();
+            });
+            events.addEventListener('krs', (event) => {
+                const version = JSON.parse(event.data).version;
+                if (renderedVersion === null || version > renderedVersion) {
+                    loadDashboard(true);
+                }
+            });
+            events.addEventListener('error', () => {
+                // a 503 (admission, worker draining) ends an EventSource for
+                // good; reconnect with jittered backoff and poll meanwhile.
+                // The first event after reconnecting carries the current
+                // version, so changes missed in between are picked up.
+                events.close();
+                startPolling();
+                setTimeout(subscribe, retryDelay * (0.5 + Math.random() / 2));
+                retryDelay = Math.min(retryDelay * 2, RETRY_MAX);
+            });
+        }
+
+        function logout() {
+            document.cookie = "session=; expires=Thu, 01 Jan 1970 00:00:00 UTC; path=/;";
+            window.location.href = '/login';
+        }
+
+        document.addEventListener('DOMContentLoaded', () => loadDashboard().then(subscribe));
+    </script>
+</body>
+</html>
+"""
+
+LOGIN_HTML = """\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Login Mahasiswa</title>
+    <style>
+        :root {
+            --primary-dark: #005461;
+            --primary: #018790;
+            --accent: #00B7B5;
+            --light-bg: #F4F4F4;
+        }
+
+        body {
+            font-family: Arial, sans-serif;
+            margin: 0;
+            padding: 0;
+            background: linear-gradient(135deg, var(--primary), var(--accent));
+            height: 100vh;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+        }
+
+        .login-container {
+            background-color: white;
+            padding: 40px;
+            border-radius: 10px;
+            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
+            width: 100%;
+            max-width: 400px;
+            text-align: center;
+        }
+
+        h1 {
+            color: var(--primary-dark);
+            margin-bottom: 30px;
+        }
+
+        .form-group {
+            margin-bottom: 20px;
+            text-align: left;
+        }
+
+        label {
+            display: block;
+            margin-bottom: 8px;
+            color: var(--primary-dark);
+            font-weight: bold;
+        }
+
+        input[type="text"], input[type="password"] {
+            width: 100%;
+            padding: 12px;
+            border: 2px solid #ddd;
+            border-radius: 5px;
+            font-size: 16px;
+            box-sizing: border-box;
+        }
+
+        input[type="text"]:focus, input[type="password"]:focus {
+            border-color: var(--primary);
+            outline: none;
+        }
+
+        .login-btn {
+            background-color: var(--primary);
+            color: white;
+            border: none;
+            padding: 15px 20px;
+            border-radius: 5px;
+            cursor: pointer;
+            font-size: 16px;
+            width: 100%;
+            margin-top: 10px;
+        }
+
+        .login-btn:hover {
+            background-color: var(--accent);
+        }
+
+        .error-message {
+            color: red;
+            margin-top: 10px;
+            display: none;
+        }
+
+        @media (max-width: 480px) {
+            .login-container {
+                margin: 20px;
+                padding: 30px 20px;
+            }
+        }
+    </style>
+</head>
+<body>
+    <div class="login-container">
+        <h1>Login Mahasiswa</h1>
+        <form id="loginForm">
+            <div class="form-group">
+                <label for="nim">NIM:</label>
+                <input type="text" id="nim" name="nim" required>
+            </div>
+            <div class="form-group">
+                <label for="password">Password:</label>
+                <input type="password" id="password" name="password" required>
+            </div>
+            <button type="submit" class="login-btn">Login</button>
+        </form>
+        <div id="errorMessage" class="error-message"></div>
+    </div>
+
+    <script>
+        document.getElementById('loginForm').addEventListener('submit', async function(e) {
+            e.preventDefault();
+
+            const formData = new FormData(this);
+            const nim = formData.get('nim');
+            const password = formData.get('password');
+
+            // Check if NIM equals password
+            if (nim !== password) {
+                document.getElementById('errorMessage').textContent = 'NIM dan Password harus sama!';
+                document.getElementById('errorMessage').style.display = 'block';
+                return;
+            }
+
+            try {
+                // Verify that the student exists in database
+                const response = await fetch(`/api/acad/mahasiswa/${encodeURIComponent(nim)}`, { method: 'HEAD' });
+                if (response.ok) {
+                    // Create a simple session cookie
+                    document.cookie = `session=${nim}; path=/;`;
+                    window.location.href = `/?nim=${nim}`;
+                } else {
+                    document.getElementById('errorMessage').textContent = response.status === 404
+                        ? 'NIM tidak ditemukan!'
+                        : 'Layanan sedang sibuk, silakan coba lagi.';
+                    document.getElementById('errorMessage').style.display = 'block';
+                }
+            } catch (error) {
+                document.getElementById('errorMessage').textContent = 'Terjadi kesalahan!';
+                document.getElementById('errorMessage').style.display = 'block';
+            }
+        });
+    </script>
+</body>
+</html>
+"""
+
+DASHBOARD_PAGE = StaticPage(DASHBOARD_HTML)
+LOGIN_PAGE = StaticPage(LOGIN_HTML)
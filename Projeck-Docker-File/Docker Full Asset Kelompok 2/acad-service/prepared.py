@@ -0,0 +1,98 @@
+import re
+
+import psycopg2
+import psycopg2.errors
+
+import metrics
+
+# PREPARE lets Postgres parse and plan a statement once per session; psycopg2
+# only knows %s, so the text is rewritten to $1..$n and EXECUTE gets the
+# arguments through the usual client-side %s interpolation
+PLACEHOLDER = re.compile(r"%s")
+PREFIX = "acad_"
+
+
+class Statement:
+    def __init__(self, name, query):
+        self.name = PREFIX + name
+        count = 0
+
+        def number(_):
+            nonlocal count
+            count += 1
+            return f"${count}"
+
+        self.prepare_sql = f"PREPARE {self.name} AS {PLACEHOLDER.sub(number, query)}"
+        self.execute_sql = f"EXECUTE {self.name}" + (f" ({', '.join(['%s'] * count)})" if count else "")
+
+
+def _invalidated(error):
+    # 26000: the statement is gone from the session (DISCARD ALL, a pooler
+    # handing out another backend); 0A000 "cached plan must not change result
+    # type": a column of the underlying tables changed since PREPARE
+    if isinstance(error, psycopg2.errors.InvalidSqlStatementName):
+        return True
+    return isinstance(error, psycopg2.errors.FeatureNotSupported) and "cached plan" in str(error)
+
+
+class StatementCache:
+    # Hot queries are prepared lazily, once per pooled connection: the set of
+    # prepared names lives on db_pool.PooledConnection.prepared, so a
+    # connection opened after a reconnect or recycle starts empty and
+    # prepares again on first use. When EXECUTE fails because the statement
+    # was dropped or its plan no longer fits the schema, the transaction is
+    # rolled back and the statement prepared and executed once more.
+    # Connections that are not pooled (scripts, explain.py) run the plain query.
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._statements = {}
+        self.prepares = 0
+        self.reprepares = 0
+
+    def _statement(self, name, query):
+        statement = self._statements.get(name)
+        if statement is None:
+            statement = self._statements[name] = Statement(name, query)
+        return statement
+
+    def _prepare(self, cursor, name, statement, reason):
+        prepared = cursor.connection.prepared
+        if statement.name in prepared:
+            cursor.execute(f"DEALLOCATE {statement.name}")
+            prepared.discard(statement.name)
+        metrics.execute(cursor, f"prepare_{name}", statement.prepare_sql)
+        prepared.add(statement.name)
+        metrics.DB_PREPARES.inc(name, reason)
+        if reason == "first":
+            self.prepares += 1
+        else:
+            self.reprepares += 1
+
+    def execute(self, cursor, name, query, params=()):
+        conn = cursor.connection
+        if not self.enabled or not hasattr(conn, "prepared"):
+            return metrics.execute(cursor, name, query, params)
+
+        statement = self._statement(name, query)
+        if statement.name not in conn.prepared:
+            self._prepare(cursor, name, statement, "first")
+        try:
+            metrics.execute(cursor, name, statement.execute_sql, params, source=query)
+        except psycopg2.Error as e:
+            if not _invalidated(e):
+                raise
+            # the failed EXECUTE aborted the transaction; these are reads,
+            # nothing before it needs keeping
+            conn.rollback()
+            if isinstance(e, psycopg2.errors.InvalidSqlStatementName):
+                conn.prepared.discard(statement.name)
+            self._prepare(cursor, name, statement, "invalidated")
+            metrics.execute(cursor, name, statement.execute_sql, params, source=query)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "statements": sorted(self._statements),
+            "prepares": self.prepares,
+            "reprepares": self.reprepares,
+        }
@@ -0,0 +1,177 @@
+import contextvars
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# per-request sampling decision, set by SamplingMiddleware and carried into
+# the DB executor by run_db(); queries outside a request are always sampled
+sampled = contextvars.ContextVar("slow_query_sampled", default=True)
+request_path = contextvars.ContextVar("slow_query_request", default=None)
+
+# EXPLAIN ANALYZE runs the statement again, so only plain reads qualify
+READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|COPY|CREATE|DROP|ALTER)\b", re.IGNORECASE)
+
+TEXT_MAX = 2000
+
+
+def _truncate(text):
+    return text if len(text) <= TEXT_MAX else text[:TEXT_MAX] + "..."
+
+
+class SlowQueryLog:
+    # Queries slower than threshold end up in a ring buffer of the last
+    # `size` entries (with SQL, parameters, duration and row count) and, if
+    # log is set, as one line on stdout. With explain=True a single
+    # background thread re-runs the statement under EXPLAIN (ANALYZE,
+    # BUFFERS) and attaches the plan; at most one plan per query name is
+    # pending, so a burst of slow requests does not double the load.
+    def __init__(
+        self,
+        threshold=0.2,
+        size=200,
+        explain=False,
+        explain_timeout=5.0,
+        get_connection=None,
+        log=print,
+    ):
+        self.threshold = threshold
+        self.explain = explain and get_connection is not None
+        self.explain_timeout = explain_timeout
+        self.get_connection = get_connection
+        self.log = log
+
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._executor = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="acad-explain") if self.explain else None
+        )
+        self._ids = 0
+
+        self.slow = 0
+        self.explained = 0
+        self.explain_errors = 0
+        self.explain_skipped = 0
+
+    def observe(self, cursor, name, query, params, seconds):
+        if seconds < self.threshold or not sampled.get():
+            return
+        metrics.DB_SLOW_QUERIES.inc(name)
+        try:
+            sql = cursor.mogrify(query, params).decode(errors="replace")
+        except Exception:
+            sql = query
+        entry = {
+            "id": None,
+            "timestamp": time.time(),
+            "query": name,
+            "duration_ms": round(seconds * 1000, 3),
+            "rows": cursor.rowcount,
+            "request": request_path.get(),
+            "sql": _truncate(" ".join(query.split())),
+            "params": _truncate(repr(params)),
+            "plan": None,
+        }
+        with self._lock:
+            self._ids += 1
+            entry["id"] = self._ids
+            self._entries.append(entry)
+            self.slow += 1
+        if self.log is not None:
+            self.log(
+                f"slow query {name}: {entry['duration_ms']:.1f} ms, {entry['rows']} rows, "
+                f"request={entry['request']} params={entry['params']}"
+            )
+        if self.explain:
+            self._schedule_explain(entry, name, sql)
+
+    def _schedule_explain(self, entry, name, sql):
+        if not READ_ONLY.match(sql) or WRITES.search(sql):
+            self.explain_skipped += 1
+            return
+        with self._lock:
+            if name in self._pending:
+                self.explain_skipped += 1
+                return
+            self._pending.add(name)
+        try:
+            self._executor.submit(self._explain, entry, name, sql)
+        except RuntimeError:
+            # executor already shut down
+            with self._lock:
+                self._pending.discard(name)
+
+    def _explain(self, entry, name, sql):
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SET LOCAL statement_timeout = %s", (int(self.explain_timeout * 1000),))
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}")
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                # nothing to keep, ANALYZE only read
+                conn.rollback()
+            with self._lock:
+                entry["plan"] = plan
+                self.explained += 1
+        except Exception as e:
+            with self._lock:
+                entry["plan"] = f"EXPLAIN failed: {e}"
+                self.explain_errors += 1
+        finally:
+            with self._lock:
+                self._pending.discard(name)
+
+    def entries(self, limit=None, name=None):
+        with self._lock:
+            entries = [dict(entry) for entry in reversed(self._entries) if name is None or entry["query"] == name]
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+        return removed
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "threshold_ms": round(self.threshold * 1000, 3),
+                "buffer_size": self._entries.maxlen,
+                "buffered": len(self._entries),
+                "slow": self.slow,
+                "explain": self.explain,
+                "explained": self.explained,
+                "explain_errors": self.explain_errors,
+                "explain_skipped": self.explain_skipped,
+                "explain_pending": len(self._pending),
+            }
+
+
+class SamplingMiddleware:
+    # Plain ASGI like metrics.MetricsMiddleware: decides once per request
+    # whether its slow queries are recorded
+    def __init__(self, app, rate=1.0):
+        self.app = app
+        self.rate = rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sample_token = sampled.set(self.rate >= 1.0 or random.random() < self.rate)
+        path_token = request_path.set(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_path.reset(path_token)
+            sampled.reset(sample_token)
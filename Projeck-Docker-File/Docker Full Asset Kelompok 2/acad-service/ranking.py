@@ -0,0 +1,181 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from nim_index import CHANGED_QUERY, REFRESH_OVERLAP
+
+# IPS kumulatif seperti /api/acad/ips: baris semester terakhir ips_summary
+STANDINGS_QUERY = """
+    SELECT DISTINCT ON (m.nim)
+           m.nim, m.nama, m.jurusan, m.angkatan, s.kumulatif_bobot, s.kumulatif_sks
+    FROM mahasiswa m
+    JOIN ips_summary s ON s.nim = m.nim
+    {where}
+    ORDER BY m.nim, s.semester DESC
+"""
+WATERMARK_QUERY = "SELECT COALESCE(MAX(updated_at), now()) FROM krs_version"
+
+
+def _score(row):
+    bobot, sks = row[4], row[5]
+    # ties are decided on the value the API shows, not on float noise
+    return round(bobot / sks, 2) if sks else None
+
+
+class RankingIndex:
+    # Per-cohort (jurusan, angkatan) list of (-ips, nim) kept sorted, so top-K
+    # is a slice and the rank of a NIM is one bisect. Equal rounded IPS share
+    # a rank (1, 2, 2, 4) and are listed by NIM. refresh() re-reads only the
+    # students whose krs_version moved since the last poll, like NimIndex;
+    # a periodic load() drops students that were deleted.
+    def __init__(self):
+        self._cohorts = {}
+        self._students = {}
+        self._watermark = None
+        self._lock = threading.Lock()
+        self.loaded_at = None
+        self.refreshed_at = None
+        self.loads = 0
+        self.refreshes = 0
+        self.updated = 0
+
+    @property
+    def ready(self):
+        return self.loaded_at is not None
+
+    @property
+    def watermark(self):
+        return self._watermark
+
+    def load(self, conn):
+        cursor = conn.cursor()
+        cursor.execute(WATERMARK_QUERY)
+        watermark = cursor.fetchone()[0]
+        cursor.execute(STANDINGS_QUERY.format(where=""))
+
+        cohorts = {}
+        students = {}
+        for row in cursor.fetchall():
+            score = _score(row)
+            if score is None:
+                continue
+            cohort = (row[2], row[3])
+            key = (-score, row[0])
+            cohorts.setdefault(cohort, []).append(key)
+            students[row[0]] = (cohort, key, row[1])
+        for keys in cohorts.values():
+            keys.sort()
+
+        with self._lock:
+            self._cohorts = cohorts
+            self._students = students
+            self._watermark = watermark
+            self.loaded_at = self.refreshed_at = time.time()
+            self.loads += 1
+        return len(students)
+
+    def refresh(self, conn):
+        if not self.ready:
+            return self.load(conn)
+
+        cursor = conn.cursor()
+        cursor.execute(CHANGED_QUERY, (self._watermark, REFRESH_OVERLAP))
+        changed = cursor.fetchall()
+        if not changed:
+            self.refreshes += 1
+            self.refreshed_at = time.time()
+            return 0
+
+        nims = sorted({row[0] for row in changed})
+        cursor.execute(STANDINGS_QUERY.format(where="WHERE m.nim = ANY(%s)"), (nims,))
+        rows = {row[0]: row for row in cursor.fetchall()}
+
+        updated = 0
+        with self._lock:
+            for nim in nims:
+                row = rows.get(nim)
+                score = _score(row) if row is not None else None
+                entry = None if score is None else ((row[2], row[3]), (-score, nim), row[1])
+                if self._students.get(nim) == entry:
+                    continue
+                self._remove(nim)
+                if entry is not None:
+                    cohort, key, _ = entry
+                    insort(self._cohorts.setdefault(cohort, []), key)
+                    self._students[nim] = entry
+                updated += 1
+            for _, updated_at in changed:
+                if updated_at > self._watermark:
+                    self._watermark = updated_at
+            self.refreshed_at = time.time()
+            self.refreshes += 1
+            self.updated += updated
+        return updated
+
+    def _remove(self, nim):
+        entry = self._students.pop(nim, None)
+        if entry is None:
+            return
+        cohort, key, _ = entry
+        keys = self._cohorts[cohort]
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            del keys[index]
+        if not keys:
+            del self._cohorts[cohort]
+
+    @staticmethod
+    def _rank(keys, key):
+        # competition ranking: 1 + number of strictly better rounded IPS
+        return bisect_left(keys, (key[0], "")) + 1
+
+    def top(self, jurusan, angkatan, k):
+        with self._lock:
+            keys = self._cohorts.get((jurusan, angkatan), [])
+            return {
+                "jurusan": jurusan,
+                "angkatan": angkatan,
+                "size": len(keys),
+                "items": [
+                    {
+                        "rank": self._rank(keys, key),
+                        "nim": key[1],
+                        "nama": self._students[key[1]][2],
+                        "ips": -key[0],
+                    }
+                    for key in keys[:k]
+                ],
+            }
+
+    def rank_of(self, nim):
+        with self._lock:
+            entry = self._students.get(nim)
+            if entry is None:
+                return None
+            (jurusan, angkatan), key, nama = entry
+            keys = self._cohorts[(jurusan, angkatan)]
+            rank = self._rank(keys, key)
+            return {
+                "nim": nim,
+                "nama": nama,
+                "jurusan": jurusan,
+                "angkatan": angkatan,
+                "ips": -key[0],
+                "rank": rank,
+                "size": len(keys),
+                # share of the cohort ranked below this student
+                "percentile": round((len(keys) - rank) / len(keys) * 100, 1),
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "cohorts": len(self._cohorts),
+                "students": len(self._students),
+                "loads": self.loads,
+                "refreshes": self.refreshes,
+                "updated": self.updated,
+                "loaded_at": self.loaded_at,
+                "refreshed_at": self.refreshed_at,
+            }
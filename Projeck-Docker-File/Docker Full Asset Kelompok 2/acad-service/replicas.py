@@ -0,0 +1,227 @@
+import contextvars
+import itertools
+import threading
+import time
+
+import psycopg2
+import psycopg2.errors
+from starlette.requests import HTTPConnection
+
+from db_pool import KEEPALIVES, ConnectionPool
+
+# set by ReadPrimaryMiddleware for clients that wrote recently, so their
+# next reads cannot land on a replica that has not replayed the write yet
+read_primary = contextvars.ContextVar("read_primary", default=False)
+
+READ_PRIMARY_COOKIE = "acad_read_primary"
+
+# replay lag in seconds; 0 while the replica has replayed everything it
+# received, otherwise the age of the last replayed transaction. "Everything
+# it received" only means up to date while WAL is still streaming in, so the
+# third column reports whether the WAL receiver is connected. Without
+# pg_read_all_stats the status column reads as NULL, but a row with a pid
+# still shows that a receiver is running.
+LAG_QUERY = """
+    SELECT pg_is_in_recovery(),
+           CASE WHEN NOT pg_is_in_recovery()
+                  OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END,
+           COALESCE(
+               (SELECT pid IS NOT NULL AND COALESCE(status, 'streaming') = 'streaming'
+                FROM pg_stat_wal_receiver),
+               false
+           )
+"""
+
+
+def parse_hosts(value, default_port):
+    # "replica1,replica2:5433" -> [("replica1", "5432"), ("replica2", "5433")]
+    hosts = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        hosts.append((host, port or default_port))
+    return hosts
+
+
+class Replica:
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = False
+        self.in_recovery = None
+        self.streaming = None
+        self.lag = None
+        self.checked_at = None
+        self.error = None
+        self.failures = 0
+
+
+class ReplicaSet:
+    # Routes read-only work to streaming replicas. Writes, and reads for
+    # NIMs written less than sticky_seconds ago, stay on the primary pool;
+    # so do all reads while no replica is healthy (unreachable, not
+    # streaming WAL, or lagging more than max_lag seconds, see check()).
+    def __init__(self, primary, replicas=(), max_lag=5.0, sticky_seconds=5.0, on_route=None):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.sticky_seconds = sticky_seconds
+        # optional hook, called with (target, reason) for every routed read
+        self.on_route = on_route
+        self._next = itertools.count()
+        self._recent = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_hosts(cls, primary, db_config, hosts, pool_config, connect_timeout=2, **kwargs):
+        replicas = []
+        for host, port in hosts:
+            # pool timeouts only bound the wait for a slot; without these a
+            # replica that drops packets hangs connect() and reads, and the
+            # db_executor thread with them
+            config = dict(db_config, host=host, port=port, connect_timeout=connect_timeout, **KEEPALIVES)
+            # replica pools grow on demand, only the primary is prewarmed
+            pool = ConnectionPool(config, **dict(pool_config, minconn=0))
+            replicas.append(Replica(f"{host}:{port}", pool))
+        return cls(primary, replicas, **kwargs)
+
+    def _route(self, target, reason):
+        if self.on_route is not None:
+            self.on_route(target, reason)
+
+    def for_read(self, *nims):
+        if not self.replicas:
+            return self.primary
+        if read_primary.get():
+            self._route("primary", "sticky")
+            return self.primary
+        if nims and self._recent:
+            now = time.monotonic()
+            recent = self._recent
+            if any(recent.get(nim, 0) > now for nim in nims):
+                self._route("primary", "sticky")
+                return self.primary
+
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            self._route("primary", "fallback")
+            return self.primary
+        replica = healthy[next(self._next) % len(healthy)]
+        self._route(replica.name, "replica")
+        return replica.pool
+
+    def _replica(self, pool):
+        for replica in self.replicas:
+            if replica.pool is pool:
+                return replica
+        return None
+
+    def failed(self, pool, error):
+        # a connection error on a replica takes it out of rotation until
+        # the next successful check(); no-op for the primary pool
+        replica = self._replica(pool)
+        if replica is not None:
+            replica.healthy = False
+            replica.error = str(error)
+
+    def read(self, fn, *args, nims=()):
+        # runs fn(pool, *args) on the pool for_read(*nims) picks. fn must be
+        # read-only: when the replica connection fails it runs once more on
+        # the primary. A cancelled statement (statement_timeout) is slow,
+        # not broken, and is not retried.
+        pool = self.for_read(*nims)
+        if pool is self.primary:
+            return fn(pool, *args)
+        try:
+            return fn(pool, *args)
+        except psycopg2.errors.QueryCanceled:
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            self.failed(pool, e)
+            self._route("primary", "retry")
+            return fn(self.primary, *args)
+
+    def wrote(self, *nims):
+        if not self.replicas or self.sticky_seconds <= 0:
+            return
+        now = time.monotonic()
+        deadline = now + self.sticky_seconds
+        with self._lock:
+            # readers look the dict up without the lock, so swap in a copy
+            recent = {nim: until for nim, until in self._recent.items() if until > now}
+            for nim in nims:
+                recent[nim] = deadline
+            self._recent = recent
+
+    def check(self, timeout=2.0):
+        for replica in self.replicas:
+            conn = None
+            broken = False
+            try:
+                conn = replica.pool.getconn(timeout=timeout)
+                cursor = conn.cursor()
+                cursor.execute(LAG_QUERY)
+                replica.in_recovery, lag, streaming = cursor.fetchone()
+                replica.lag = float(lag)
+                # a standby that lost its upstream has replayed all it
+                # received and would report 0 lag while serving stale data
+                replica.streaming = streaming or not replica.in_recovery
+                replica.error = None if replica.streaming else "WAL receiver is not streaming"
+                replica.healthy = replica.streaming and replica.lag <= self.max_lag
+            except Exception as e:
+                broken = conn is not None
+                replica.healthy = False
+                replica.streaming = None
+                replica.lag = None
+                replica.error = str(e)
+            finally:
+                if conn is not None:
+                    replica.pool.putconn(conn, broken=broken)
+            replica.failures = 0 if replica.healthy else replica.failures + 1
+            replica.checked_at = time.time()
+        return sum(replica.healthy for replica in self.replicas)
+
+    def close(self):
+        return sum(replica.pool.close() for replica in self.replicas)
+
+    def stats(self):
+        return {
+            "max_lag_seconds": self.max_lag,
+            "sticky_seconds": self.sticky_seconds,
+            "sticky_nims": len(self._recent),
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "in_recovery": replica.in_recovery,
+                    "streaming": replica.streaming,
+                    "lag_seconds": replica.lag,
+                    "checked_at": replica.checked_at,
+                    "failures": replica.failures,
+                    "error": replica.error,
+                    "pool": replica.pool.stats(),
+                }
+                for replica in self.replicas
+            ],
+        }
+
+
+class ReadPrimaryMiddleware:
+    # Plain ASGI like metrics.MetricsMiddleware: the context variable is set
+    # in the request's own task, so handlers and run_db() see it
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or READ_PRIMARY_COOKIE not in HTTPConnection(scope).cookies:
+            await self.app(scope, receive, send)
+            return
+        token = read_primary.set(True)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            read_primary.reset(token)
@@ -0,0 +1,106 @@
+"""Production entry point for acad-service.
+
+    python serve.py
+
+Runs uvicorn with WEB_CONCURRENCY worker processes (default 1). Each worker
+opens its own DB pool of DB_POOL_MIN..DB_POOL_MAX connections, so the
+database sees up to WEB_CONCURRENCY * DB_POOL_MAX of them.
+
+On SIGTERM a worker first only flips /health/ready to 503 and keeps serving
+for DRAIN_DELAY seconds, so the load balancer stops routing to it before
+the listening socket closes. Then uvicorn's graceful shutdown waits up to
+GRACEFUL_TIMEOUT seconds for in-flight requests. A second SIGTERM or
+SIGINT skips the drain delay.
+
+With several workers the probe reaches whichever worker accepts the
+connection, so the workers share their state through pid files in
+WORKER_BOARD_DIR and /health/ready only passes while every worker is ready
+(lifecycle.WorkerBoard). All workers get SIGTERM at once and drain in
+parallel; stop_grace_period must cover DRAIN_DELAY + GRACEFUL_TIMEOUT.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import tempfile
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+import lifecycle
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "3002"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+DRAIN_DELAY = float(os.getenv("DRAIN_DELAY", "5"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "20"))
+WORKER_BOARD_DIR = os.getenv("WORKER_BOARD_DIR", os.path.join(tempfile.gettempdir(), f"acad-workers-{PORT}"))
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class DrainingServer(uvicorn.Server):
+    def handle_exit(self, sig, frame):
+        if sig == signal.SIGTERM and DRAIN_DELAY > 0 and not lifecycle.state.draining:
+            lifecycle.state.start_draining()
+            logger.info("SIGTERM received, draining for %.1f seconds", DRAIN_DELAY)
+            asyncio.get_event_loop().call_later(DRAIN_DELAY, super().handle_exit, sig, frame)
+            return
+        super().handle_exit(sig, frame)
+
+
+class DrainingMultiprocess(Multiprocess):
+    def shutdown(self):
+        # signal every worker before waiting on any, so they drain in
+        # parallel instead of one DRAIN_DELAY after another
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        logger.info("Stopping parent process [%d]", self.pid)
+
+
+def bind_socket(host, port):
+    # instead of Config.bind_socket(), which passes proto=0: asyncio only sets
+    # TCP_NODELAY on accepted sockets whose proto is IPPROTO_TCP, and without
+    # it every keep-alive response waits ~40 ms on Nagle plus delayed ACK
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    logger.info("Uvicorn running on http://%s:%d (Press CTRL+C to quit)", host, port)
+    return sock
+
+
+def prepare_worker_board(directory, workers):
+    # files left by workers of an earlier run would count as live workers
+    # once their pids are reused; the spawned workers inherit the env
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.environ["ACAD_WORKER_BOARD"] = directory
+    os.environ["ACAD_WORKERS"] = str(workers)
+
+
+def main():
+    config = uvicorn.Config(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+    )
+    server = DrainingServer(config)
+    if config.workers > 1:
+        prepare_worker_board(WORKER_BOARD_DIR, config.workers)
+        sock = bind_socket(HOST, PORT)
+        DrainingMultiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the service modules live flat in acad-service/, next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
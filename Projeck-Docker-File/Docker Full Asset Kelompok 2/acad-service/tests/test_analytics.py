@@ -0,0 +1,69 @@
+from analytics import PERCENTILES, cohort_from_row, cohort_query
+
+
+def test_query_without_filters_groups_every_cohort():
+    query, params = cohort_query(None, None, None)
+    assert "{" not in query
+    # only the histogram's own NULL filter, no cohort filter
+    assert query.count("WHERE") == 1
+    assert params == {"percentiles": list(PERCENTILES)}
+    assert "GROUP BY m.jurusan, m.angkatan, s.semester" in query
+    assert "GROUP BY m.jurusan, m.angkatan, krs.semester, krs.nilai" in query
+
+
+def test_filters_apply_to_both_aggregates():
+    query, params = cohort_query("Informatika", 2022, 3)
+    assert params == {
+        "percentiles": list(PERCENTILES),
+        "jurusan": "Informatika",
+        "angkatan": 2022,
+        "semester": 3,
+    }
+    assert "WHERE m.jurusan = %(jurusan)s AND m.angkatan = %(angkatan)s AND s.semester = %(semester)s" in query
+    assert "WHERE m.jurusan = %(jurusan)s AND m.angkatan = %(angkatan)s AND krs.semester = %(semester)s" in query
+
+
+def test_single_filter():
+    query, params = cohort_query(None, 2021, None)
+    assert set(params) == {"percentiles", "angkatan"}
+    assert query.count("m.angkatan = %(angkatan)s") == 2
+    assert "%(jurusan)s" not in query and "%(semester)s" not in query
+
+
+def row(percentiles=(2.5, 2.91, 3.333, 3.6, 3.85), histogram=None):
+    # column order of COHORT_QUERY's final SELECT
+    return (
+        "Informatika", 2022, 3, 120,
+        3.2567, percentiles, 1.004, 4.0,
+        2400.0, {"B": 40, "A": 50, "C": 30} if histogram is None else histogram,
+    )
+
+
+def test_row_becomes_one_cohort_bucket():
+    cohort = cohort_from_row(row())
+    assert (cohort["jurusan"], cohort["angkatan"], cohort["semester"], cohort["mahasiswa"]) == (
+        "Informatika", 2022, 3, 120,
+    )
+    assert cohort["ips"]["mean"] == 3.26
+    assert cohort["ips"]["min"] == 1.0
+    assert cohort["ips"]["max"] == 4.0
+    assert cohort["sks_total"] == 2400
+    assert isinstance(cohort["sks_total"], int)
+
+
+def test_percentiles_are_labelled_and_median_is_p50():
+    ips = cohort_from_row(row())["ips"]
+    assert ips["percentiles"] == {"p10": 2.5, "p25": 2.91, "p50": 3.33, "p75": 3.6, "p90": 3.85}
+    assert ips["median"] == ips["percentiles"]["p50"]
+
+
+def test_histogram_is_sorted_by_grade():
+    assert list(cohort_from_row(row())["nilai"]) == ["A", "B", "C"]
+
+
+def test_cohort_without_grades_or_percentiles():
+    # LEFT JOIN without krs rows: histogram NULL
+    cohort = cohort_from_row(row(percentiles=None)[:9] + (None,))
+    assert cohort["nilai"] == {}
+    assert cohort["ips"]["median"] is None
+    assert set(cohort["ips"]["percentiles"].values()) == {None}
@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+
+from cache import ResponseCache
+
+
+class Loader:
+    # counts calls; each call waits on `release` so tests control when the
+    # load finishes
+    def __init__(self, value="value"):
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return f"{self.value}-{self.calls}"
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = ResponseCache()
+        loader = Loader()
+        tasks = [asyncio.create_task(cache.get_or_load("k", loader, ttl=60)) for _ in range(5)]
+        await settle()
+        loader.release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert results == ["value-1"] * 5
+        assert loader.calls == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["coalesced"] == 4
+        # stored: the next lookup is a hit
+        assert await cache.get_or_load("k", loader, ttl=60) == "value-1"
+        assert cache.stats()["hits"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_during_load_is_not_stored():
+    async def scenario():
+        cache = ResponseCache()
+        loader = Loader()
+        task = asyncio.create_task(cache.get_or_load("k", loader, ttl=60, tags=("nim:1",)))
+        await settle()
+        cache.invalidate("nim:1")
+        loader.release.set()
+
+        # the caller still gets the value it waited for ...
+        assert await task == "value-1"
+        # ... but it was not cached, the next lookup loads again
+        assert await cache.get_or_load("k", loader, ttl=60) == "value-2"
+        assert loader.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_uses_tags_of_loaded_value():
+    async def scenario():
+        cache = ResponseCache()
+        loader = Loader()
+        loader.release.set()
+        await cache.get_or_load("k", loader, ttl=60, tags_of=lambda value: ("mk:IF101",))
+        assert cache.invalidate("mk:IF101") == 1
+        assert cache.stats()["size"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_leader_hands_load_to_follower():
+    async def scenario():
+        cache = ResponseCache()
+        loader = Loader()
+        leader = asyncio.create_task(cache.get_or_load("k", loader, ttl=60))
+        await settle()
+        followers = [asyncio.create_task(cache.get_or_load("k", loader, ttl=60)) for _ in range(3)]
+        await settle()
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        await settle()
+        loader.release.set()
+
+        # one follower took over the load, the others coalesced onto it
+        assert await asyncio.gather(*followers) == ["value-2"] * 3
+        assert loader.calls == 2
+        assert cache.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_loader_error_reaches_followers_and_is_not_cached():
+    async def scenario():
+        cache = ResponseCache()
+        release = asyncio.Event()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            raise RuntimeError("db down")
+
+        tasks = [asyncio.create_task(cache.get_or_load("k", failing, ttl=60)) for _ in range(2)]
+        await settle()
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert calls == 1
+        assert cache.stats()["size"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_entries_expire_after_ttl():
+    async def scenario():
+        cache = ResponseCache()
+        loader = Loader()
+        loader.release.set()
+        assert await cache.get_or_load("k", loader, ttl=0.05) == "value-1"
+        assert await cache.get_or_load("k", loader, ttl=0.05) == "value-1"
+        await asyncio.sleep(0.1)
+        assert await cache.get_or_load("k", loader, ttl=0.05) == "value-2"
+        assert cache.stats()["expirations"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_least_recently_used_entry_is_evicted():
+    async def scenario():
+        cache = ResponseCache(max_entries=2)
+        loader = Loader()
+        loader.release.set()
+        await cache.get_or_load("a", loader, ttl=60)
+        await cache.get_or_load("b", loader, ttl=60)
+        # touching "a" makes "b" the oldest
+        await cache.get_or_load("a", loader, ttl=60)
+        await cache.get_or_load("c", loader, ttl=60)
+
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["size"] == 2
+        calls = loader.calls
+        await cache.get_or_load("a", loader, ttl=60)
+        assert loader.calls == calls
+        await cache.get_or_load("b", loader, ttl=60)
+        assert loader.calls == calls + 1
+
+    asyncio.run(scenario())
+
+
+def test_zero_ttl_bypasses_cache():
+    async def scenario():
+        cache = ResponseCache()
+        loader = Loader()
+        loader.release.set()
+        await cache.get_or_load("k", loader, ttl=0)
+        await cache.get_or_load("k", loader, ttl=0)
+        assert loader.calls == 2
+        assert cache.stats()["size"] == 0
+
+    asyncio.run(scenario())
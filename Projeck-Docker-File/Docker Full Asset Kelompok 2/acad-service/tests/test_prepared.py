@@ -0,0 +1,128 @@
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+import psycopg2.errors  # noqa: E402
+
+from prepared import Statement, StatementCache  # noqa: E402
+
+QUERY = "SELECT ips FROM krs_version WHERE nim = %s AND semester = %s"
+
+
+class FakeConnection:
+    # stands in for db_pool.PooledConnection: `prepared` holds the names
+    # PREPAREd in this session
+    def __init__(self, pooled=True):
+        if pooled:
+            self.prepared = set()
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeCursor:
+    # records every statement; `failures` are raised by the next EXECUTEs
+    def __init__(self, connection, failures=()):
+        self.connection = connection
+        self.failures = list(failures)
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append(query if params is None else (query, params))
+        if query.startswith("EXECUTE") and self.failures:
+            raise self.failures.pop(0)
+
+
+def test_placeholders_become_numbered_parameters():
+    statement = Statement("ips", QUERY)
+    assert statement.name == "acad_ips"
+    assert statement.prepare_sql == (
+        "PREPARE acad_ips AS SELECT ips FROM krs_version WHERE nim = $1 AND semester = $2"
+    )
+    assert statement.execute_sql == "EXECUTE acad_ips (%s, %s)"
+
+
+def test_statement_without_parameters():
+    statement = Statement("version", "SELECT max(updated_at) FROM krs_version")
+    assert statement.execute_sql == "EXECUTE acad_version"
+
+
+def test_statement_is_prepared_once_per_connection():
+    cache = StatementCache()
+    cursor = FakeCursor(FakeConnection())
+    cache.execute(cursor, "ips", QUERY, ("001", 3))
+    cache.execute(cursor, "ips", QUERY, ("002", 3))
+
+    statement = Statement("ips", QUERY)
+    assert cursor.executed == [
+        statement.prepare_sql,
+        (statement.execute_sql, ("001", 3)),
+        (statement.execute_sql, ("002", 3)),
+    ]
+    assert cursor.connection.prepared == {"acad_ips"}
+
+    # a fresh connection (reconnect, recycle) prepares again
+    other = FakeCursor(FakeConnection())
+    cache.execute(other, "ips", QUERY, ("001", 3))
+    assert other.executed[0] == statement.prepare_sql
+    assert cache.stats()["prepares"] == 2
+
+
+def test_unpooled_connection_runs_the_plain_query():
+    cursor = FakeCursor(FakeConnection(pooled=False))
+    StatementCache().execute(cursor, "ips", QUERY, ("001", 3))
+    assert cursor.executed == [(QUERY, ("001", 3))]
+
+
+def test_disabled_cache_runs_the_plain_query():
+    cursor = FakeCursor(FakeConnection())
+    StatementCache(enabled=False).execute(cursor, "ips", QUERY, ("001", 3))
+    assert cursor.executed == [(QUERY, ("001", 3))]
+
+
+def test_dropped_statement_is_prepared_again():
+    # 26000: the session lost the statement, nothing to DEALLOCATE
+    cache = StatementCache()
+    cursor = FakeCursor(FakeConnection(), [psycopg2.errors.InvalidSqlStatementName()])
+    cache.execute(cursor, "ips", QUERY, ("001", 3))
+
+    statement = Statement("ips", QUERY)
+    assert cursor.executed == [
+        statement.prepare_sql,
+        (statement.execute_sql, ("001", 3)),
+        statement.prepare_sql,
+        (statement.execute_sql, ("001", 3)),
+    ]
+    assert cursor.connection.rollbacks == 1
+    assert cache.stats()["reprepares"] == 1
+
+
+def test_stale_plan_is_deallocated_and_prepared_again():
+    # 0A000: the statement still exists but its result type changed
+    cache = StatementCache()
+    error = psycopg2.errors.FeatureNotSupported("cached plan must not change result type")
+    cursor = FakeCursor(FakeConnection(), [error])
+    cache.execute(cursor, "ips", QUERY, ("001", 3))
+
+    statement = Statement("ips", QUERY)
+    assert cursor.executed[2:] == [
+        "DEALLOCATE acad_ips",
+        statement.prepare_sql,
+        (statement.execute_sql, ("001", 3)),
+    ]
+    assert cursor.connection.prepared == {"acad_ips"}
+    assert cache.stats()["reprepares"] == 1
+
+
+def test_other_errors_are_raised():
+    cache = StatementCache()
+    unsupported = psycopg2.errors.FeatureNotSupported("something else")
+    cursor = FakeCursor(FakeConnection(), [unsupported])
+    with pytest.raises(psycopg2.errors.FeatureNotSupported):
+        cache.execute(cursor, "ips", QUERY, ("001", 3))
+
+    cursor = FakeCursor(FakeConnection(), [psycopg2.errors.QueryCanceled()])
+    with pytest.raises(psycopg2.errors.QueryCanceled):
+        cache.execute(cursor, "ips", QUERY, ("001", 3))
+    assert cursor.connection.rollbacks == 0
+    assert cache.stats()["reprepares"] == 0
@@ -0,0 +1,99 @@
+import asyncio
+
+import metrics
+import profiler
+from profiler import SamplingMiddleware, SlowQueryLog
+
+
+class FakeCursor:
+    rowcount = 7
+
+    def mogrify(self, query, params):
+        return (query % params).encode()
+
+
+def slow_count(name):
+    return metrics.DB_SLOW_QUERIES._values.get((name,), 0)
+
+
+def observed(log, seconds, name="ips", sampled=True, path=None):
+    sample_token = profiler.sampled.set(sampled)
+    path_token = profiler.request_path.set(path)
+    try:
+        log.observe(FakeCursor(), name, "SELECT ips FROM krs_version\n WHERE nim = %s", ("001",), seconds)
+    finally:
+        profiler.request_path.reset(path_token)
+        profiler.sampled.reset(sample_token)
+
+
+def test_queries_below_threshold_are_not_recorded():
+    log = SlowQueryLog(threshold=0.2, log=None)
+    observed(log, 0.199)
+    assert log.entries() == []
+    assert log.slow == 0
+
+
+def test_unsampled_requests_are_not_recorded():
+    log = SlowQueryLog(threshold=0.2, log=None)
+    before = slow_count("ips")
+    observed(log, 1.0, sampled=False)
+    assert log.entries() == []
+    assert slow_count("ips") == before
+
+
+def test_slow_query_is_recorded_with_request_and_rows():
+    lines = []
+    log = SlowQueryLog(threshold=0.2, log=lines.append)
+    before = slow_count("ips")
+    # the threshold itself already counts as slow
+    observed(log, 0.2, path="GET /api/acad/ips")
+
+    [entry] = log.entries()
+    assert entry["id"] == 1
+    assert entry["query"] == "ips"
+    assert entry["duration_ms"] == 200.0
+    assert entry["rows"] == 7
+    assert entry["request"] == "GET /api/acad/ips"
+    assert entry["sql"] == "SELECT ips FROM krs_version WHERE nim = %s"
+    assert entry["params"] == "('001',)"
+    assert slow_count("ips") == before + 1
+    assert len(lines) == 1 and "slow query ips: 200.0 ms, 7 rows" in lines[0]
+
+
+def test_ring_buffer_keeps_the_newest_entries():
+    log = SlowQueryLog(threshold=0, size=3, log=None)
+    for i in range(5):
+        observed(log, 0.01, name=f"q{i}")
+    assert [entry["query"] for entry in log.entries()] == ["q4", "q3", "q2"]
+    assert log.stats()["buffered"] == 3
+    assert log.stats()["slow"] == 5
+
+
+def test_entries_filter_limit_and_clear():
+    log = SlowQueryLog(threshold=0, log=None)
+    for name in ("ips", "dashboard", "ips"):
+        observed(log, 0.01, name=name)
+    assert [entry["id"] for entry in log.entries(name="ips")] == [3, 1]
+    assert [entry["id"] for entry in log.entries(limit=1)] == [3]
+    assert log.clear() == 3
+    assert log.entries() == []
+
+
+def sampled_in(rate, scope_type="http"):
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append((profiler.sampled.get(), profiler.request_path.get()))
+
+    scope = {"type": scope_type, "method": "GET", "path": "/api/acad/ips"}
+    asyncio.run(SamplingMiddleware(app, rate=rate)(scope, None, None))
+    return seen[0]
+
+
+def test_sampling_middleware_rate():
+    assert sampled_in(1.0) == (True, "GET /api/acad/ips")
+    assert sampled_in(0.0) == (False, "GET /api/acad/ips")
+    # lifespan and websocket scopes keep the defaults
+    assert sampled_in(0.0, scope_type="lifespan") == (True, None)
+    # reset after the request
+    assert profiler.sampled.get() is True
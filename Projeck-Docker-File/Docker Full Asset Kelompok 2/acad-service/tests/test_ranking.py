@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone
+
+from nim_index import CHANGED_QUERY
+from ranking import WATERMARK_QUERY, RankingIndex
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeDatabase:
+    # answers the three queries RankingIndex issues from in-memory rows:
+    # standings are (nim, nama, jurusan, angkatan, kumulatif_bobot, kumulatif_sks)
+    def __init__(self, standings):
+        self.standings = {row[0]: row for row in standings}
+        self.changed = []
+        self.watermark = T0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+
+    def execute(self, query, params=None):
+        if query == WATERMARK_QUERY:
+            self.result = [(self.db.watermark,)]
+        elif query == CHANGED_QUERY:
+            self.result = list(self.db.changed)
+        elif params is None:
+            self.result = sorted(self.db.standings.values())
+        else:
+            self.result = [self.db.standings[nim] for nim in params[0] if nim in self.db.standings]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+def student(nim, jurusan, ips, sks=20, angkatan=2022):
+    return (nim, f"Mahasiswa {nim}", jurusan, angkatan, ips * sks, sks)
+
+
+def loaded(*rows):
+    db = FakeDatabase(rows)
+    index = RankingIndex()
+    index.load(db)
+    return db, index
+
+
+def test_top_k_is_ordered_by_ips_then_nim():
+    _, index = loaded(
+        student("003", "IF", 3.20),
+        student("001", "IF", 3.90),
+        student("002", "IF", 3.50),
+        student("004", "SI", 4.00),
+    )
+    top = index.top("IF", 2022, 2)
+    assert top["size"] == 3
+    assert [(item["rank"], item["nim"], item["ips"]) for item in top["items"]] == [
+        (1, "001", 3.9),
+        (2, "002", 3.5),
+    ]
+
+
+def test_ties_share_a_rank_and_skip_the_next():
+    _, index = loaded(
+        student("001", "IF", 3.50),
+        student("002", "IF", 3.80),
+        student("003", "IF", 3.50),
+        student("004", "IF", 3.00),
+    )
+    ranks = [(item["nim"], item["rank"]) for item in index.top("IF", 2022, 10)["items"]]
+    assert ranks == [("002", 1), ("001", 2), ("003", 2), ("004", 4)]
+    assert index.rank_of("003")["rank"] == 2
+    assert index.rank_of("004")["rank"] == 4
+
+
+def test_ties_use_the_rounded_ips():
+    # 3.501 and 3.499 both show as 3.5
+    _, index = loaded(student("001", "IF", 3.501), student("002", "IF", 3.499))
+    assert index.rank_of("001")["rank"] == index.rank_of("002")["rank"] == 1
+
+
+def test_rank_of_reports_cohort_size_and_percentile():
+    _, index = loaded(*(student(f"{i:03d}", "IF", 2.0 + i / 10) for i in range(1, 11)))
+    best = index.rank_of("010")
+    assert (best["rank"], best["size"], best["percentile"]) == (1, 10, 90.0)
+    assert index.rank_of("001")["percentile"] == 0.0
+    assert index.rank_of("999") is None
+
+
+def test_students_without_sks_are_not_ranked():
+    _, index = loaded(student("001", "IF", 3.0), ("002", "Baru", "IF", 2022, 0, 0))
+    assert index.rank_of("002") is None
+    assert index.top("IF", 2022, 10)["size"] == 1
+
+
+def test_refresh_moves_changed_students():
+    db, index = loaded(
+        student("001", "IF", 3.00),
+        student("002", "IF", 3.50),
+        student("003", "SI", 3.20),
+    )
+    db.standings["001"] = student("001", "IF", 3.90)
+    # 003 switched jurusan
+    db.standings["003"] = student("003", "IF", 2.00)
+    db.changed = [("001", T0 + timedelta(seconds=1)), ("003", T0 + timedelta(seconds=2))]
+
+    assert index.refresh(db) == 2
+    assert [item["nim"] for item in index.top("IF", 2022, 10)["items"]] == ["001", "002", "003"]
+    assert index.top("SI", 2022, 10)["size"] == 0
+    assert index.watermark == T0 + timedelta(seconds=2)
+
+
+def test_refresh_drops_deleted_students():
+    db, index = loaded(student("001", "IF", 3.00), student("002", "IF", 3.50))
+    del db.standings["002"]
+    db.changed = [("002", T0 + timedelta(seconds=1))]
+
+    assert index.refresh(db) == 1
+    assert index.rank_of("002") is None
+    assert index.rank_of("001")["rank"] == 1
+
+
+def test_refresh_without_changes_keeps_the_index():
+    db, index = loaded(student("001", "IF", 3.00))
+    assert index.refresh(db) == 0
+    assert index.stats()["refreshes"] == 1
+    assert index.rank_of("001")["rank"] == 1